@@ -6,6 +6,7 @@ in the Django administration panel.
 """
 
 from django.contrib import admin
+from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
@@ -23,7 +24,9 @@ class DocumentJobAdmin(admin.ModelAdmin):
     # =========================
     list_display = [
         'short_id',
+        'thumbnail',
         'template_name',
+        'job_type',
         'status_badge',
         'created_at',
         'completed_at',
@@ -33,6 +36,8 @@ class DocumentJobAdmin(admin.ModelAdmin):
     list_filter = [
         'status',
         'template_name',
+        'job_type',
+        'output_profile',
         'created_at',
     ]
 
@@ -48,6 +53,8 @@ class DocumentJobAdmin(admin.ModelAdmin):
     # =========================
     # Detail view configuration
     # =========================
+    raw_id_fields = ['parent']
+
     readonly_fields = [
         'id',
         'celery_task_id',
@@ -66,6 +73,9 @@ class DocumentJobAdmin(admin.ModelAdmin):
                 'fields': [
                     'id',
                     'template_name',
+                    'job_type',
+                    'parent',
+                    'output_profile',
                     'status',
                     'celery_task_id',
                 ]
@@ -96,6 +106,7 @@ class DocumentJobAdmin(admin.ModelAdmin):
             {
                 'fields': [
                     'error_message',
+                    'error_code',
                     'created_at',
                     'updated_at',
                     'started_at',
@@ -113,6 +124,18 @@ class DocumentJobAdmin(admin.ModelAdmin):
         """Muestra los primeros 8 caracteres del UUID."""
         return str(obj.id)[:8]
 
+    @admin.display(description=_('Miniatura'))
+    def thumbnail(self, obj) -> str:
+        """Muestra la miniatura de la primera página de los PDF generados."""
+        if not obj.is_completed() or not obj.output_file \
+                or not obj.output_file.name.endswith('.pdf'):
+            return '-'
+
+        return format_html(
+            '<img src="{}" alt="" loading="lazy" style="height: 60px; border: 1px solid #ddd;">',
+            reverse('documentos:thumbnail', args=[obj.id]),
+        )
+
     @admin.display(description=_('Estado'))
     def status_badge(self, obj) -> str:
         """Muestra el estado del trabajo con una insignia de color."""
@@ -197,7 +220,8 @@ class DocumentJobAdmin(admin.ModelAdmin):
         for job in failed_jobs:
             job.status = DocumentJob.Status.PENDING
             job.error_message = None
-            job.save(update_fields=['status', 'error_message'])
+            job.error_code = None
+            job.save(update_fields=['status', 'error_message', 'error_code'])
 
             DocumentService.send_to_celery(job)
             retried_count += 1
@@ -0,0 +1,443 @@
+"""
+Direct PDF drawing for fixed-layout templates.
+
+Templates whose every element sits at a known position (certificates,
+labels) do not need HTML layout. A template selecting the ``canvas``
+renderer is drawn from ``layouts/<template>.json`` in TEMPLATES_DOC_DIR
+with reportlab, which skips CSS cascade, box layout and font shaping.
+
+A layout describes one page::
+
+    {
+        "unit": "in",
+        "page": {"width": 8.5, "height": 11},
+        "fonts": {"Serif": "assets/fonts/serif.ttf"},
+        "elements": [
+            {"type": "rect", "x": 0.4, "y": 0.4, "width": 7.7, "height": 10.2,
+             "stroke": "#d4af37", "line_width": 2.25},
+            {"type": "text", "x": 4.25, "y": 4.25, "align": "center",
+             "text": "{{ recipient_name }}", "font": "Times-Bold", "size": 24},
+            {"type": "paragraph", "x": 1.25, "y": 4.85, "width": 6, "height": 1.5,
+             "text": "{{ achievement_text }}", "size": 10.5, "leading": 18.9,
+             "if": "achievement_text"}
+        ]
+    }
+
+Positions and sizes are in ``unit`` (in, cm, mm or pt) measured from
+the top-left corner; ``y`` is the baseline of a text and the top of
+every other element. Font sizes and line widths are in points. ``text``
+values are Jinja2 templates and ``if`` a Jinja2 expression, both
+evaluated against the job context without HTML escaping. ``qr``
+(``size``) and ``barcode`` (``height_mm``, ``symbology``) elements
+encode their ``text`` through the code caches of docs.codes. ``dots``
+fills its box with a grid of ``r`` circles every ``spacing``. Shapes
+take an ``opacity`` for their fill.
+
+Fonts are the PDF standard fonts or TrueType files registered under
+``fonts``: a path relative to TEMPLATES_DOC_DIR, or a file name looked
+up in the CANVAS_FONT_DIRS directories and their subdirectories. Each
+layout font is registered under its name and file, so layouts giving
+the same name to different files do not draw with each other's font.
+The standard fonts only cover WinAnsi (cp1252), so text bound to job
+data should use a registered Unicode font.
+"""
+
+import hashlib
+import json
+import logging
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from jinja2 import Environment
+from reportlab.graphics import renderPDF
+from reportlab.lib.colors import HexColor
+from reportlab.lib.units import cm, inch, mm
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+from .codes import barcode_drawing, qr_matrix
+from .governor import check_page_count
+from .rendering import get_environment
+
+logger = logging.getLogger(__name__)
+
+UNITS = {'in': inch, 'cm': cm, 'mm': mm, 'pt': 1}
+
+DEFAULT_FONT = 'Times-Roman'
+
+# path -> (mtime_ns, compiled layout)
+_layouts: dict[str, tuple[int, dict]] = {}
+
+# path -> ImageReader
+_images: dict[str, ImageReader] = {}
+
+# font file name -> path found in CANVAS_FONT_DIRS
+_font_paths: dict[str, Path] = {}
+
+# (layout font name, font path) -> name registered with reportlab
+_fonts: dict[tuple[str, str], str] = {}
+
+_environment: Environment | None = None
+
+
+def layout_path(template_name: str) -> Path:
+    """Return the path of the canvas layout of a template."""
+    return settings.TEMPLATES_DOC_DIR / 'layouts' / f'{template_name}.json'
+
+
+def has_layout(template_name: str) -> bool:
+    """Return True if the template can be drawn by the canvas renderer."""
+    return layout_path(template_name).is_file()
+
+
+def render_canvas_pdf(
+    template_name: str,
+    context: dict,
+    options: dict | None = None,
+    budget: dict | None = None,
+) -> bytes:
+    """
+    Draw a fixed-layout template straight to PDF.
+
+    The output profile options are WeasyPrint settings and do not apply
+    to drawn documents.
+
+    Args:
+        template_name: Template identifier with a layouts/<name>.json file
+        context: Context data for the text fields and conditions
+        options: WeasyPrint options of the output profile (ignored)
+        budget: Render budget of the template
+
+    Returns:
+        PDF binary content
+    """
+    layout = load_layout(template_name)
+    check_page_count(1, (budget or {}).get('max_pages'))
+
+    buffer = BytesIO()
+    pdf = Canvas(
+        buffer,
+        pagesize=(layout['width'], layout['height']),
+        pageCompression=1,
+        invariant=1,
+    )
+
+    for element in layout['elements']:
+        condition = element.get('if')
+        if condition is not None and not condition(**context):
+            continue
+        _DRAW[element['type']](pdf, layout, element, context)
+
+    pdf.showPage()
+    pdf.save()
+
+    return buffer.getvalue()
+
+
+def load_layout(template_name: str) -> dict:
+    """
+    Return the compiled layout of a template, reloading it when it changes.
+
+    Coordinates are converted to PDF points, text fields and conditions
+    are compiled, and the declared fonts are registered with reportlab.
+
+    Args:
+        template_name: Template identifier
+
+    Returns:
+        Layout with 'width', 'height', 'unit' and 'elements'
+    """
+    path = layout_path(template_name)
+    key = str(path)
+    mtime_ns = path.stat().st_mtime_ns
+
+    cached = _layouts.get(key)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+
+    source = json.loads(path.read_text(encoding='utf-8'))
+    unit = UNITS[source.get('unit', 'pt')]
+
+    fonts = {
+        font_name: _register_font(font_name, _resolve_font(font_file))
+        for font_name, font_file in source.get('fonts', {}).items()
+    }
+
+    env = _get_environment()
+    elements = []
+    for element in source['elements']:
+        if element['type'] not in _DRAW:
+            raise ValueError(f'Unknown layout element type: {element["type"]}')
+
+        compiled = dict(element)
+        if 'font' in element:
+            compiled['font'] = fonts.get(element['font'], element['font'])
+        if 'text' in element:
+            compiled['text'] = env.from_string(element['text'])
+        if 'if' in element:
+            compiled['if'] = env.compile_expression(element['if'])
+        elements.append(compiled)
+
+    layout = {
+        'width': source['page']['width'] * unit,
+        'height': source['page']['height'] * unit,
+        'unit': unit,
+        'elements': elements,
+    }
+
+    _layouts[key] = (mtime_ns, layout)
+    logger.info('Canvas layout loaded: %s (%d elements)', path.name, len(elements))
+
+    return layout
+
+
+def _get_environment() -> Environment:
+    """Jinja2 environment for layout fields: shared filters, no HTML escaping."""
+    global _environment
+
+    if _environment is None:
+        _environment = get_environment().overlay(autoescape=False)
+
+    return _environment
+
+
+def _resolve_font(font_file: str) -> Path:
+    """Find a layout font: relative to TEMPLATES_DOC_DIR, else by name in CANVAS_FONT_DIRS."""
+    path = settings.TEMPLATES_DOC_DIR / font_file
+    if path.is_file():
+        return path
+
+    name = Path(font_file).name
+    found = _font_paths.get(name)
+    if found is not None and found.is_file():
+        return found
+
+    for font_dir in settings.CANVAS_FONT_DIRS:
+        found = next((match for match in Path(font_dir).rglob(name) if match.is_file()), None)
+        if found is not None:
+            _font_paths[name] = found
+            return found
+
+    raise FileNotFoundError(f'Font not found in TEMPLATES_DOC_DIR or CANVAS_FONT_DIRS: {font_file}')
+
+
+def _register_font(font_name: str, path: Path) -> str:
+    """Register a TrueType font once per name and file; return its reportlab name."""
+    key = (font_name, str(path.resolve()))
+    registered = _fonts.get(key)
+    if registered is None:
+        registered = f'{font_name}-{hashlib.sha256(key[1].encode("utf-8")).hexdigest()[:8]}'
+        pdfmetrics.registerFont(TTFont(registered, key[1]))
+        _fonts[key] = registered
+
+    return registered
+
+
+# =========================
+# Element drawing
+# =========================
+def _draw_text(pdf: Canvas, layout: dict, element: dict, context: dict) -> None:
+    text = element['text'].render(context).strip()
+    if not text:
+        return
+
+    font = element.get('font', DEFAULT_FONT)
+    size = element.get('size', 10)
+    char_space = element.get('char_space', 0)
+    x, y = _position(layout, element)
+
+    width = pdfmetrics.stringWidth(text, font, size) + char_space * (len(text) - 1)
+    align = element.get('align', 'left')
+    if align == 'center':
+        x -= width / 2
+    elif align == 'right':
+        x -= width
+
+    pdf.setFont(font, size)
+    pdf.setFillColor(HexColor(element.get('color', '#000000')))
+    pdf.drawString(x, y, text, charSpace=char_space)
+
+
+def _draw_paragraph(pdf: Canvas, layout: dict, element: dict, context: dict) -> None:
+    font = element.get('font', DEFAULT_FONT)
+    size = element.get('size', 10)
+    leading = element.get('leading', size * 1.2)
+    width = element['width'] * layout['unit']
+    align = element.get('align', 'left')
+    x, top = _position(layout, element)
+
+    lines = []
+    for text in element['text'].render(context).strip().splitlines():
+        lines.extend(simpleSplit(' '.join(text.split()), font, size, width) or [''])
+
+    if 'height' in element:
+        # Like overflow: hidden, drop the lines that do not fit in the box
+        lines = lines[:max(int(element['height'] * layout['unit'] // leading), 0)]
+
+    pdf.setFont(font, size)
+    pdf.setFillColor(HexColor(element.get('color', '#000000')))
+
+    # First baseline one font size below the top of the box
+    y = top - size
+    for line in lines:
+        if align == 'center':
+            pdf.drawCentredString(x + width / 2, y, line)
+        elif align == 'right':
+            pdf.drawRightString(x + width, y, line)
+        else:
+            pdf.drawString(x, y, line)
+        y -= leading
+
+
+def _draw_rect(pdf: Canvas, layout: dict, element: dict, context: dict) -> None:
+    x, top = _position(layout, element)
+    width = element['width'] * layout['unit']
+    height = element['height'] * layout['unit']
+
+    fill, stroke = _set_paint(pdf, element)
+    pdf.roundRect(
+        x,
+        top - height,
+        width,
+        height,
+        element.get('radius', 0) * layout['unit'],
+        stroke=stroke,
+        fill=fill,
+    )
+
+
+def _draw_circle(pdf: Canvas, layout: dict, element: dict, context: dict) -> None:
+    x, y = _position(layout, element)
+
+    fill, stroke = _set_paint(pdf, element)
+    pdf.circle(x, y, element['r'] * layout['unit'], stroke=stroke, fill=fill)
+
+
+def _draw_dots(pdf: Canvas, layout: dict, element: dict, context: dict) -> None:
+    unit = layout['unit']
+    x, top = _position(layout, element)
+    width = element['width'] * unit
+    height = element['height'] * unit
+    spacing = element['spacing'] * unit
+    radius = element['r'] * unit
+
+    # One path for the whole grid, centred in each spacing cell
+    path = pdf.beginPath()
+    for column in range(int(width // spacing)):
+        for row in range(int(height // spacing)):
+            path.circle(x + (column + 0.5) * spacing, top - (row + 0.5) * spacing, radius)
+
+    # The opacity of the grid must not carry over to later elements
+    pdf.saveState()
+    fill, stroke = _set_paint(pdf, element)
+    pdf.drawPath(path, stroke=stroke, fill=fill)
+    pdf.restoreState()
+
+
+def _draw_line(pdf: Canvas, layout: dict, element: dict, context: dict) -> None:
+    unit = layout['unit']
+
+    pdf.setStrokeColor(HexColor(element.get('stroke', '#000000')))
+    pdf.setLineWidth(element.get('line_width', 1))
+    pdf.line(
+        element['x1'] * unit,
+        layout['height'] - element['y1'] * unit,
+        element['x2'] * unit,
+        layout['height'] - element['y2'] * unit,
+    )
+
+
+def _draw_image(pdf: Canvas, layout: dict, element: dict, context: dict) -> None:
+    path = Path(settings.DOCUMENT_ASSETS_DIR) / element['src']
+    key = str(path)
+    if key not in _images:
+        _images[key] = ImageReader(key)
+
+    x, top = _position(layout, element)
+    height = element['height'] * layout['unit']
+    pdf.drawImage(
+        _images[key],
+        x,
+        top - height,
+        width=element['width'] * layout['unit'],
+        height=height,
+        mask='auto',
+    )
+
+
+def _draw_qr(pdf: Canvas, layout: dict, element: dict, context: dict) -> None:
+    value = element['text'].render(context).strip()
+    if not value:
+        return
+
+    matrix = qr_matrix(value, element.get('error', 'M').upper(), element.get('border', 4))
+    module = element['size'] * layout['unit'] / len(matrix)
+    x, top = _position(layout, element)
+
+    # Dark modules as one filled path, like the SVG output of the filter
+    path = pdf.beginPath()
+    for row_index, row in enumerate(matrix):
+        for column_index, dark in enumerate(row):
+            if dark:
+                path.rect(
+                    x + column_index * module,
+                    top - (row_index + 1) * module,
+                    module,
+                    module,
+                )
+
+    pdf.setFillColor(HexColor(element.get('color', '#000000')))
+    pdf.drawPath(path, stroke=0, fill=1)
+
+
+def _draw_barcode(pdf: Canvas, layout: dict, element: dict, context: dict) -> None:
+    value = element['text'].render(context).strip()
+    if not value:
+        return
+
+    drawing = barcode_drawing(
+        value,
+        element.get('symbology', 'Code128'),
+        float(element.get('height_mm', 12)),
+        float(element.get('bar_width_mm', 0.3)),
+        bool(element.get('human_readable', True)),
+    )
+    x, top = _position(layout, element)
+    renderPDF.draw(drawing, pdf, x, top - drawing.height)
+
+
+def _position(layout: dict, element: dict) -> tuple[float, float]:
+    """Convert the top-left based position of an element to PDF points."""
+    return (
+        element['x'] * layout['unit'],
+        layout['height'] - element['y'] * layout['unit'],
+    )
+
+
+def _set_paint(pdf: Canvas, element: dict) -> tuple[int, int]:
+    """Apply the fill and stroke of a shape; return the flags to draw it with."""
+    if 'fill' in element:
+        pdf.setFillColor(HexColor(element['fill']))
+        pdf.setFillAlpha(element.get('opacity', 1))
+    if 'stroke' in element:
+        pdf.setStrokeColor(HexColor(element['stroke']))
+        pdf.setLineWidth(element.get('line_width', 1))
+
+    return int('fill' in element), int('stroke' in element)
+
+
+# Layout element type -> drawing function
+_DRAW = {
+    'text': _draw_text,
+    'paragraph': _draw_paragraph,
+    'rect': _draw_rect,
+    'circle': _draw_circle,
+    'dots': _draw_dots,
+    'line': _draw_line,
+    'image': _draw_image,
+    'qr': _draw_qr,
+    'barcode': _draw_barcode,
+}
@@ -0,0 +1,269 @@
+"""
+Page-chunked rendering for documents with very long tables.
+
+WeasyPrint layout time grows faster than linearly with the size of a
+table. For templates declared in CHUNKED_TEMPLATES, a context whose row
+list is longer than ``rows_per_chunk`` is split into chunks that are
+laid out in parallel by render subprocesses and concatenated.
+
+The fan-out runs in the Celery worker process, which owns the chunk
+pool (CHUNK_RENDER_WORKERS subprocesses, recycled like the render pool);
+render subprocesses never start pools of their own.
+
+Each chunk renders the full template with a ``chunk`` variable, so the
+template can limit headers to the first chunk and totals to the last;
+table headers repeat on every page as usual. ``chunk.carried`` holds the
+amount the rows of the previous chunks add up to in the template's
+PAGINATED_TABLES entry, so page subtotals keep running across chunks.
+Page numbers are left out of the chunk layouts and stamped afterwards
+from the ``page_numbers`` stylesheet, so numbering runs across the whole
+document.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import BytesIO
+
+from django.conf import settings
+from pypdf import PdfReader, PdfWriter
+from weasyprint import HTML
+
+from .governor import check_page_count, enforce_budget
+from .pagination import sum_amounts
+from .pdf import fetch_asset, get_base_url, get_font_config, load_stylesheets
+from .render_pool import RenderPool
+from .render_worker import in_render_worker
+from .rendering import render_html, resolve_stylesheets
+
+logger = logging.getLogger(__name__)
+
+_chunk_pool: RenderPool | None = None
+
+
+def is_chunked(template_name: str, context: dict) -> bool:
+    """Return True if the context is large enough to be rendered in chunks."""
+    config = settings.CHUNKED_TEMPLATES.get(template_name)
+    if config is None:
+        return False
+
+    rows = context.get(config['rows_key'])
+    return isinstance(rows, list) and len(rows) > config['rows_per_chunk']
+
+
+def render_chunked_pdf(
+    template_name: str,
+    context: dict,
+    options: dict | None = None,
+    budget: dict | None = None,
+) -> bytes:
+    """
+    Render a large document as parallel chunks and concatenate them.
+
+    Called from the Celery worker process, under the time limit of the
+    template budget: the chunks and the page numbers are laid out in the
+    chunk pool, where each chunk is held to the memory limit.
+
+    Args:
+        template_name: Template identifier declared in CHUNKED_TEMPLATES
+        context: Context data; its row list is split across chunks
+        options: WeasyPrint options of the output profile
+        budget: Render budget of the template; max_html_chars and
+            max_memory_mb apply to each chunk, max_pages to the whole
+            document
+
+    Returns:
+        PDF binary content
+    """
+    config = settings.CHUNKED_TEMPLATES[template_name]
+    options = options or {}
+    budget = budget or {}
+    rows = context[config['rows_key']]
+    size = config['rows_per_chunk']
+    count = (len(rows) + size - 1) // size
+
+    chunk_rows = [rows[index * size:(index + 1) * size] for index in range(count)]
+
+    # Amount carried into each chunk by the pre-paginated table, if any
+    carried = [Decimal(0)]
+    if template_name in settings.PAGINATED_TABLES:
+        for rows_before in chunk_rows[:-1]:
+            carried.append(carried[-1] + sum_amounts(rows_before, template_name))
+    else:
+        carried *= count
+
+    chunk_contexts = [
+        {
+            **context,
+            config['rows_key']: chunk_rows[index],
+            'chunk': {
+                'index': index,
+                'count': count,
+                'first': index == 0,
+                'last': index == count - 1,
+                'carried': carried[index],
+            },
+        }
+        for index in range(count)
+    ]
+
+    logger.info(
+        'Rendering %s in %d chunks (%d rows)',
+        template_name,
+        count,
+        len(rows),
+    )
+
+    writer = PdfWriter()
+    chunk_pdfs = _render_chunks(
+        template_name,
+        chunk_contexts,
+        options,
+        budget.get('max_html_chars'),
+        budget.get('max_memory_mb'),
+    )
+    for pdf_bytes in chunk_pdfs:
+        writer.append(PdfReader(BytesIO(pdf_bytes)))
+
+    page_count = len(writer.pages)
+    check_page_count(page_count, budget.get('max_pages'))
+
+    if config.get('page_numbers'):
+        numbers = PdfReader(BytesIO(
+            _run(layout_page_numbers, config['page_numbers'], page_count, options)
+        ))
+        for page, number_page in zip(writer.pages, numbers.pages):
+            page.merge_page(number_page)
+
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def render_chunk(
+    template_name: str,
+    context: dict,
+    options: dict,
+    max_chars: int | None = None,
+    max_memory_mb: int | None = None,
+) -> bytes:
+    """
+    Lay out a single chunk, without the page number stylesheet.
+
+    Runs in a render subprocess; must stay importable at module level.
+    The memory limit is checked against the RSS growth of the process
+    laying the chunk out.
+    """
+    config = settings.CHUNKED_TEMPLATES[template_name]
+    numbering = config.get('page_numbers')
+    paths = [
+        path for path in resolve_stylesheets(template_name)
+        if numbering is None or path != settings.TEMPLATES_DOC_DIR / numbering
+    ]
+
+    with enforce_budget({'max_memory_mb': max_memory_mb}):
+        html = HTML(
+            string=render_html(template_name, context, max_chars=max_chars),
+            base_url=get_base_url(),
+            url_fetcher=fetch_asset,
+        )
+
+        return html.write_pdf(
+            stylesheets=load_stylesheets(paths),
+            font_config=get_font_config(),
+            **options,
+        )
+
+
+def layout_page_numbers(stylesheet: str, page_count: int, options: dict) -> bytes:
+    """
+    Lay out transparent pages carrying only the page number margin boxes.
+
+    Only the numbering stylesheet is applied, so it must hold every @page
+    rule (size, margins) of the template. Runs in a render subprocess.
+    """
+    html = HTML(
+        string='<div style="break-after: page"></div>' * (page_count - 1) + '<div></div>',
+        base_url=get_base_url(),
+        url_fetcher=fetch_asset,
+    )
+
+    return html.write_pdf(
+        stylesheets=load_stylesheets([settings.TEMPLATES_DOC_DIR / stylesheet]),
+        font_config=get_font_config(),
+        **options,
+    )
+
+
+def close_chunk_pool() -> None:
+    """Stop the chunk subprocesses of this worker process."""
+    global _chunk_pool
+
+    if _chunk_pool is not None:
+        _chunk_pool.close()
+        _chunk_pool = None
+
+
+def _render_chunks(
+    template_name: str,
+    chunk_contexts: list[dict],
+    options: dict,
+    max_chars: int | None,
+    max_memory_mb: int | None,
+) -> list[bytes]:
+    if not _uses_chunk_pool():
+        # Inline, the budget of the enclosing render already covers memory
+        return [
+            render_chunk(template_name, chunk_context, options, max_chars)
+            for chunk_context in chunk_contexts
+        ]
+
+    pool = _get_chunk_pool()
+    executor = ThreadPoolExecutor(max_workers=pool.size)
+    futures = [
+        executor.submit(
+            pool.run,
+            render_chunk,
+            template_name,
+            chunk_context,
+            options,
+            max_chars,
+            max_memory_mb,
+        )
+        for chunk_context in chunk_contexts
+    ]
+
+    try:
+        return [future.result() for future in futures]
+    except BaseException:
+        # Fail fast on a failed chunk or an exceeded budget: drop the chunks
+        # not started and kill the running ones, whose threads then return
+        # and release their subprocess to the pool
+        for future in futures:
+            future.cancel()
+        pool.kill_running()
+        raise
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(function, *args):
+    """Run a layout function in the chunk pool, or inline."""
+    if not _uses_chunk_pool():
+        return function(*args)
+
+    return _get_chunk_pool().run(function, *args)
+
+
+def _uses_chunk_pool() -> bool:
+    # A render subprocess lays out chunks itself rather than start a pool
+    return settings.RENDER_POOL_ENABLED and not in_render_worker()
+
+
+def _get_chunk_pool() -> RenderPool:
+    global _chunk_pool
+
+    if _chunk_pool is None:
+        _chunk_pool = RenderPool(settings.CHUNK_RENDER_WORKERS)
+
+    return _chunk_pool
@@ -0,0 +1,208 @@
+"""
+Composite documents assembled from several templates.
+
+A template declared in COMPOSITE_TEMPLATES is a list of parts, each an
+HTML template laid out as its own PDF. Dynamic parts are rendered with
+the job data; static parts (fixed terms, annexes) are laid out once per
+version, without job data, and cached as PDF. The final document is the
+concatenation of the parts' pages, so cached sections are never laid
+out again.
+
+Previews render every part as HTML and join them into one page; the
+HTML of the dynamic parts is handed to a PDF job with the same payload,
+like that of a plain template.
+"""
+
+import json
+import logging
+import os
+import re
+from collections.abc import Callable
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from pypdf import PdfReader, PdfWriter
+from weasyprint import CSS, HTML
+
+from .governor import check_page_count
+from .pdf import fetch_asset, get_base_url, get_font_config, get_stylesheets
+from .render_cache import digest_sources, file_fingerprint, fingerprint_assets, fingerprint_templates
+from .rendering import render_html, resolve_stylesheets
+
+logger = logging.getLogger(__name__)
+
+BODY_RE = re.compile(r'<body[^>]*>(.*)</body>', re.DOTALL | re.IGNORECASE)
+
+PAGE_BREAK_HTML = '<div style="break-before: page"></div>'
+
+# (template_name, part template) -> (section version, cached section)
+_sections: dict[tuple[str, str], tuple[str, PdfReader]] = {}
+
+
+def is_composite(template_name: str) -> bool:
+    """Return True if the template is declared in COMPOSITE_TEMPLATES."""
+    return template_name in settings.COMPOSITE_TEMPLATES
+
+
+def render_composite_pdf(
+    template_name: str,
+    context: dict,
+    options: dict | None = None,
+    budget: dict | None = None,
+    render_part: Callable[[str, dict, int | None], str] | None = None,
+) -> bytes:
+    """
+    Render the dynamic parts of a composite template and concatenate them
+    with its cached static sections.
+
+    Every part uses the stylesheets of the template.
+
+    Args:
+        template_name: Template identifier declared in COMPOSITE_TEMPLATES
+        context: Context data for the dynamic parts
+        options: WeasyPrint options of the output profile
+        budget: Render budget of the template
+        render_part: Called with (part template, context, max_chars) to
+            render a dynamic part; defaults to render_html()
+
+    Returns:
+        PDF binary content
+    """
+    options = options or {}
+    budget = budget or {}
+    render_part = render_part or _render_part
+    stylesheets = get_stylesheets(template_name)
+
+    writer = PdfWriter()
+    for part in settings.COMPOSITE_TEMPLATES[template_name]:
+        if part.get('static'):
+            reader = _get_section(template_name, part['template'], stylesheets, options)
+        else:
+            reader = PdfReader(BytesIO(_layout(
+                render_part(part['template'], context, budget.get('max_html_chars')),
+                stylesheets,
+                options,
+            )))
+        writer.append(reader)
+
+    check_page_count(len(writer.pages), budget.get('max_pages'))
+
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def render_parts_html(
+    template_name: str,
+    context: dict,
+    max_chars: int | None = None,
+) -> list[tuple[dict, str]]:
+    """
+    Render the HTML of every part of a composite template, in order.
+
+    Static parts are rendered without job data, as in their cached PDF.
+
+    Args:
+        template_name: Template identifier declared in COMPOSITE_TEMPLATES
+        context: Context data for the dynamic parts
+        max_chars: Maximum rendered HTML size of each part
+
+    Returns:
+        (part, rendered HTML) for each COMPOSITE_TEMPLATES entry
+    """
+    return [
+        (part, render_html(part['template'], {} if part.get('static') else context, max_chars=max_chars))
+        for part in settings.COMPOSITE_TEMPLATES[template_name]
+    ]
+
+
+def join_parts_html(parts_html: list[str]) -> str:
+    """
+    Join the HTML documents of the parts into one, for display.
+
+    The head of the first part is kept, and the body of each part starts
+    on a new page.
+    """
+    bodies = []
+    for html in parts_html:
+        match = BODY_RE.search(html)
+        bodies.append(match.group(1) if match else html)
+
+    first = parts_html[0]
+    match = BODY_RE.search(first)
+    if match is None:
+        return PAGE_BREAK_HTML.join(bodies)
+
+    return first[:match.start(1)] + PAGE_BREAK_HTML.join(bodies) + first[match.end(1):]
+
+
+def section_version(template_name: str, part_template: str, options: dict | None = None) -> str:
+    """
+    Hash the sources of a static section.
+
+    Covers the part and every template it extends or includes, the
+    stylesheets of the template, the asset directory and the options.
+
+    Args:
+        template_name: Template identifier declared in COMPOSITE_TEMPLATES
+        part_template: Template file of the static part
+        options: WeasyPrint options the section is written with
+
+    Returns:
+        Hex digest that changes whenever the section must be rebuilt
+    """
+    sources = fingerprint_templates([part_template])
+    for path in resolve_stylesheets(template_name):
+        sources[f'css:{path.name}'] = file_fingerprint(path)[0]
+    sources.update(fingerprint_assets())
+    sources['options'] = json.dumps(options or {}, sort_keys=True)
+
+    return digest_sources(sources)
+
+
+def _get_section(
+    template_name: str,
+    part_template: str,
+    stylesheets: list[CSS],
+    options: dict,
+) -> PdfReader:
+    """
+    Return a static section, laying it out if needed.
+
+    The PDF is stored in SECTION_CACHE_DIR under its version, so every
+    worker process on the node lays it out at most once per version.
+    """
+    version = section_version(template_name, part_template, options)
+    key = (template_name, part_template)
+    cached = _sections.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    name = Path(part_template).name.split('.')[0]
+    cache_path = Path(settings.SECTION_CACHE_DIR) / f'{template_name}-{name}-{version[:16]}.pdf'
+    if not cache_path.exists():
+        pdf_bytes = _layout(render_html(part_template, {}), stylesheets, options)
+
+        temp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        temp_path.write_bytes(pdf_bytes)
+        os.replace(temp_path, cache_path)
+        logger.info('Static section rendered: %s', cache_path.name)
+
+    section = PdfReader(BytesIO(cache_path.read_bytes()))
+    _sections[key] = (version, section)
+    return section
+
+
+def _render_part(part_template: str, context: dict, max_chars: int | None) -> str:
+    return render_html(part_template, context, max_chars=max_chars)
+
+
+def _layout(html_content: str, stylesheets: list[CSS], options: dict) -> bytes:
+    html = HTML(
+        string=html_content,
+        base_url=get_base_url(),
+        url_fetcher=fetch_asset,
+    )
+
+    return html.write_pdf(stylesheets=stylesheets, font_config=get_font_config(), **options)
@@ -0,0 +1,141 @@
+"""
+Batch rendering of DOCX templates.
+
+All the records of a batch job are rendered from the same cached
+template (docs.docx_templates) in one render call, into one of two
+bundles written to RENDER_SPOOL_DIR:
+
+- ``zip``: one .docx per record, each written straight into its member
+  of the zip as it is rendered, so only one document is in memory.
+- ``merged``: one .docx with the body of every record, separated by page
+  breaks. Headers, footers and document properties are rendered with the
+  first record.
+
+Progress is written to Django's cache every DOCX_BATCH_PROGRESS_INTERVAL
+records, so the status of the job can be read from any process.
+"""
+
+import logging
+import os
+import tempfile
+from pathlib import Path
+from zipfile import ZIP_STORED, ZipFile
+
+from django.conf import settings
+from django.core.cache import cache
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+from .docx_templates import get_docx_template
+from .images import inline_images
+
+logger = logging.getLogger(__name__)
+
+BUNDLES = ('zip', 'merged')
+
+PROGRESS_PREFIX = 'docx-batch-progress'
+
+# Progress entries outlive any batch
+PROGRESS_TTL = 24 * 60 * 60
+
+PAGE_BREAK_XML = f'<w:p {nsdecls("w")}><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+def render_docx_batch(
+    job_id: str,
+    template_name: str,
+    template_path: str,
+    records: list[dict],
+    bundle: str = 'zip',
+) -> Path:
+    """
+    Render every record of a batch job into a zip or a merged document.
+
+    Args:
+        job_id: UUID of the batch job, to report progress under
+        template_name: Template identifier
+        template_path: Path of the .docx template
+        records: One context dictionary per record
+        bundle: 'zip' (one file per record) or 'merged' (one document)
+
+    Returns:
+        Path of the bundle in RENDER_SPOOL_DIR, to be handed to
+        save_output_file()
+    """
+    suffix = '.zip' if bundle == 'zip' else '.docx'
+    descriptor, spool_path = tempfile.mkstemp(suffix=suffix, dir=settings.RENDER_SPOOL_DIR)
+
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            if bundle == 'zip':
+                _write_zip(output, job_id, template_name, template_path, records)
+            else:
+                _write_merged(output, job_id, template_path, records)
+    except BaseException:
+        os.remove(spool_path)
+        raise
+
+    set_progress(job_id, len(records), len(records))
+    return Path(spool_path)
+
+
+def set_progress(job_id: str, done: int, total: int) -> None:
+    """Store how many records of a batch job have been rendered."""
+    cache.set(f'{PROGRESS_PREFIX}:{job_id}', {'done': done, 'total': total}, PROGRESS_TTL)
+
+
+def get_progress(job_id: str) -> dict | None:
+    """Return the progress of a batch job ('done', 'total'), if any was reported."""
+    return cache.get(f'{PROGRESS_PREFIX}:{job_id}')
+
+
+def _write_zip(output, job_id: str, template_name: str, template_path: str, records: list) -> None:
+    """Write one document per record into a zip, streaming each member."""
+    width = len(str(len(records)))
+
+    # The documents are already deflated, so members are stored as is
+    with ZipFile(output, 'w', ZIP_STORED) as bundle:
+        for index, record in enumerate(records, start=1):
+            doc = get_docx_template(template_path)
+            doc.render(inline_images(doc, record), autoescape=True)
+
+            with bundle.open(f'{template_name}-{index:0{width}d}.docx', 'w') as member:
+                doc.save(member)
+
+            _report(job_id, index, len(records))
+
+
+def _write_merged(output, job_id: str, template_path: str, records: list) -> None:
+    """Write one document holding the body of every record, one after another."""
+    doc = get_docx_template(template_path)
+    doc.render(inline_images(doc, records[0]), autoescape=True)
+    _report(job_id, 1, len(records))
+
+    body = doc.docx.element.body
+    # The section properties of the template stay last in the body
+    section = body.find(qn('w:sectPr'))
+
+    def insert(element) -> None:
+        if section is None:
+            body.append(element)
+        else:
+            section.addprevious(element)
+
+    for index, record in enumerate(records[1:], start=2):
+        tree = doc.fix_tables(doc.build_xml(inline_images(doc, record), doc.entry['env']))
+        # Continues the drawing ids of the previous records
+        doc.fix_docpr_ids(tree)
+
+        insert(parse_xml(PAGE_BREAK_XML))
+        for element in list(tree):
+            if element.tag != qn('w:sectPr'):
+                insert(element)
+
+        _report(job_id, index, len(records))
+
+    doc.save(output)
+
+
+def _report(job_id: str, done: int, total: int) -> None:
+    if done % settings.DOCX_BATCH_PROGRESS_INTERVAL == 0:
+        set_progress(job_id, done, total)
@@ -0,0 +1,246 @@
+"""
+Per-process cache of preprocessed DOCX templates.
+
+Constructing a DocxTemplate for every job re-reads the .docx file,
+re-parses every part, reruns docxtpl's tag cleanup (patch_xml) and
+compiles the result into a fresh Jinja2 template. The cache keeps, per
+template file version (by content hash), the file bytes, the parsed
+python-docx document, the cleaned-up XML of the body, headers and
+footers, and their compiled Jinja2 templates. Each render works on a
+deep copy of the parsed document, so rendering never mutates shared
+state and the .docx zip is not opened or parsed again.
+"""
+
+import copy
+import hashlib
+import logging
+import os
+import struct
+import sys
+import zlib
+from io import BytesIO
+from pathlib import Path
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo, sizeFileHeader
+
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.part import XmlPart
+from docx.opc.pkgwriter import _ContentTypesItem
+from docxtpl import DocxTemplate
+from jinja2 import Environment, Template
+
+logger = logging.getLogger(__name__)
+
+# path -> (mtime_ns, size, entry)
+_templates: dict[str, tuple[int, int, dict]] = {}
+
+CORE_PROPERTIES_PARTNAME = '/docProps/core.xml'
+
+# Bytes read at a time when copying a stored zip member
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Stored members are copied through zipfile internals (fp, filelist,
+# NameToInfo, start_dir, _didModify), checked on these Python versions;
+# other versions recompress the member with writestr()
+RAW_COPY_VERSIONS = ((3, 12), (3, 13))
+RAW_COPY = sys.version_info[:2] in RAW_COPY_VERSIONS
+
+
+class TemplateEnvironment(Environment):
+    """Jinja2 environment that compiles each distinct part source once."""
+
+    def __init__(self) -> None:
+        super().__init__(autoescape=True)
+        self._compiled: dict[str, Template] = {}
+
+    def from_string(self, source, globals=None, template_class=None) -> Template:
+        if globals is not None or template_class is not None:
+            return super().from_string(source, globals, template_class)
+
+        template = self._compiled.get(source)
+        if template is None:
+            template = super().from_string(source)
+            self._compiled[source] = template
+
+        return template
+
+
+class CachedDocxTemplate(DocxTemplate):
+    """DocxTemplate reading its cleaned-up parts from a cache entry."""
+
+    def __init__(self, entry: dict) -> None:
+        super().__init__(BytesIO(entry['data']))
+        self.entry = entry
+
+    def init_docx(self, reload: bool = True) -> None:
+        # Copy the parsed template rather than reopening the .docx file
+        if not self.docx or (self.is_rendered and reload):
+            self.docx = copy.deepcopy(self.entry['document'])
+            self.is_rendered = False
+
+    def render(self, context, jinja_env=None, autoescape=False) -> None:
+        # Renders share the entry environment (which always autoescapes),
+        # so each part is compiled once per template version
+        super().render(context, jinja_env=jinja_env or self.entry['env'], autoescape=autoescape)
+
+    def build_xml(self, context, jinja_env=None) -> str:
+        return self.render_xml_part(self.entry['body'], self.docx._part, context, jinja_env)
+
+    def build_headers_footers_xml(self, context, uri, jinja_env=None):
+        for rel_key, part in self.get_headers_footers(uri):
+            xml = self.render_xml_part(
+                self.entry['parts'][str(part.partname)],
+                part,
+                context,
+                jinja_env,
+            )
+            yield rel_key, xml.encode('utf-8')
+
+    def save(self, filename, *args, **kwargs) -> None:
+        # Replaced media and zip members are patched by docxtpl after
+        # python-docx has written the file
+        if (
+            not self.is_rendered
+            or self.crc_to_new_media
+            or self.crc_to_new_embedded
+            or self.zipname_to_replace
+        ):
+            super().save(filename, *args, **kwargs)
+            return
+
+        self.pre_processing()
+        write_package(self.docx.part.package, self.entry, filename)
+        self.is_saved = True
+
+
+def get_docx_template(template_path: str | Path) -> CachedDocxTemplate:
+    """
+    Return a fresh DocxTemplate for a file, built from the process cache.
+
+    The entry is rebuilt when the file content hash changes; the hash is
+    only recomputed when the modification time or size changes.
+
+    Args:
+        template_path: Path of the .docx template
+
+    Returns:
+        DocxTemplate ready to render() and save()
+    """
+    return CachedDocxTemplate(_get_entry(str(template_path)))
+
+
+def write_package(package, entry: dict, target) -> None:
+    """
+    Write a rendered document package as a .docx zip.
+
+    Members are written in python-docx's order. XML parts other than the
+    rendered ones are assumed untouched: templates using sub-documents
+    that merge styles or numbering must be saved with DocxTemplate.
+
+    Args:
+        package: python-docx package of the rendered document
+        entry: Cache entry of the template the document was opened from
+        target: Path or binary file object to write to
+    """
+    with ZipFile(BytesIO(entry['data'])) as source, ZipFile(target, 'w', ZIP_DEFLATED) as output:
+        members = {info.filename: info for info in source.infolist()}
+        parts = list(package.iter_parts())
+
+        output.writestr(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+        output.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+
+        for part in parts:
+            info = members.get(part.partname.membername)
+            if info is not None and _is_unchanged(part, info, entry['rendered']):
+                _copy_member(source, output, info)
+            else:
+                output.writestr(part.partname.membername, part.blob)
+
+            if len(part.rels):
+                output.writestr(part.partname.rels_uri.membername, part.rels.xml)
+
+
+def _is_unchanged(part, info: ZipInfo, rendered: frozenset[str]) -> bool:
+    """Return True if a part can be copied from its template member."""
+    if str(part.partname) in rendered:
+        return False
+
+    if isinstance(part, XmlPart):
+        # Parsed by python-docx, but not rewritten by rendering
+        return True
+
+    # Binary parts (media, footnotes rendered by docxtpl) hold their blob
+    blob = part.blob
+    return len(blob) == info.file_size and zlib.crc32(blob) == info.CRC
+
+
+def _copy_member(source: ZipFile, output: ZipFile, info: ZipInfo) -> None:
+    """Copy a zip member as stored, without decompressing and recompressing it."""
+    if not RAW_COPY:
+        output.writestr(copy.copy(info), source.read(info))
+        return
+
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(sizeFileHeader)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    source.fp.seek(info.header_offset + sizeFileHeader + name_length + extra_length)
+
+    member = copy.copy(info)
+    member.header_offset = output.fp.tell()
+    # CRC and sizes are known, so they go in the local header rather than
+    # in a data descriptor
+    member.flag_bits &= ~0x08
+    output.fp.write(member.FileHeader())
+
+    remaining = info.compress_size
+    while remaining:
+        chunk = source.fp.read(min(COPY_CHUNK_SIZE, remaining))
+        output.fp.write(chunk)
+        remaining -= len(chunk)
+
+    output.filelist.append(member)
+    output.NameToInfo[member.filename] = member
+    output.start_dir = output.fp.tell()
+    output._didModify = True
+
+
+def _get_entry(path: str) -> dict:
+    stat = os.stat(path)
+    cached = _templates.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    with open(path, 'rb') as template_file:
+        data = template_file.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    if cached and cached[2]['hash'] == digest:
+        entry = cached[2]
+    else:
+        entry = _build_entry(data, digest)
+        logger.info('DOCX template preprocessed: %s (%s)', Path(path).name, digest[:12])
+
+    _templates[path] = (stat.st_mtime_ns, stat.st_size, entry)
+    return entry
+
+
+def _build_entry(data: bytes, digest: str) -> dict:
+    """Clean up the body, header and footer XML of a template once."""
+    template = DocxTemplate(BytesIO(data))
+    template.init_docx()
+
+    parts = {}
+    for uri in (template.HEADER_URI, template.FOOTER_URI):
+        for _, part in template.get_headers_footers(uri):
+            parts[str(part.partname)] = template.patch_xml(template.get_part_xml(part))
+
+    return {
+        'hash': digest,
+        'data': data,
+        # Never rendered; each render gets a deep copy (init_docx)
+        'document': template.docx,
+        'body': template.patch_xml(template.get_xml()),
+        'parts': parts,
+        # Parts rewritten by every render, core properties included
+        'rendered': frozenset({str(template.docx.part.partname), *parts, CORE_PROPERTIES_PARTNAME}),
+        'env': TemplateEnvironment(),
+    }
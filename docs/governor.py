@@ -0,0 +1,173 @@
+"""
+Render resource governor for the documents application.
+
+Each template has a budget (RENDER_BUDGETS, overridden per template by
+DOCUMENT_RENDER_BUDGETS) limiting the rendered HTML size, the number of
+pages, the render time and the memory a render may allocate. Jobs with
+several records use the template budget scaled by the number of records,
+up to RENDER_BATCH_BUDGETS. A job that exceeds its budget fails with
+RenderBudgetExceeded, which tasks do not retry: the same input would
+exceed it again.
+"""
+
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .render_worker import current_rss
+
+# Seconds between time/memory checks while a render is running
+CHECK_INTERVAL = 0.25
+
+# Limits multiplied by the number of records of a batch
+SCALED_LIMITS = ('max_html_chars', 'max_pages', 'max_seconds')
+
+
+class RenderBudgetExceeded(Exception):
+    """A render went over one of the limits of its template budget."""
+
+    code = 'render_budget_exceeded'
+
+    def __init__(self, limit: str, message: str) -> None:
+        super().__init__(limit, message)
+        self.limit = limit
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message
+
+
+def get_render_budget(template_name: str) -> dict:
+    """
+    Return the render budget of a template.
+
+    Args:
+        template_name: Template identifier
+
+    Returns:
+        RENDER_BUDGETS updated with the template overrides; a limit of
+        None disables it
+    """
+    return {
+        **settings.RENDER_BUDGETS,
+        **settings.DOCUMENT_RENDER_BUDGETS.get(template_name, {}),
+    }
+
+
+def get_batch_budget(template_name: str, record_count: int) -> dict:
+    """
+    Return the render budget of a job rendering several records at once.
+
+    Args:
+        template_name: Template identifier
+        record_count: Number of records rendered together
+
+    Returns:
+        Template budget with the size and time limits multiplied by the
+        number of records, capped by RENDER_BATCH_BUDGETS, and the memory
+        limit of RENDER_BATCH_BUDGETS
+    """
+    budget = get_render_budget(template_name)
+    caps = settings.RENDER_BATCH_BUDGETS
+
+    for limit in SCALED_LIMITS:
+        scaled = budget[limit] * record_count if budget[limit] is not None else None
+        budget[limit] = min(
+            (value for value in (scaled, caps.get(limit)) if value is not None),
+            default=None,
+        )
+    budget['max_memory_mb'] = caps.get('max_memory_mb')
+
+    return budget
+
+
+def join_limited(chunks, max_chars: int | None) -> str:
+    """
+    Join rendered template chunks, stopping as soon as max_chars is passed.
+
+    Args:
+        chunks: Iterable of strings (e.g. Template.generate())
+        max_chars: Maximum length of the result, or None
+
+    Returns:
+        Joined string
+    """
+    if max_chars is None:
+        return ''.join(chunks)
+
+    parts = []
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size > max_chars:
+            raise RenderBudgetExceeded(
+                'max_html_chars',
+                f'Rendered HTML exceeds {max_chars} characters',
+            )
+        parts.append(chunk)
+
+    return ''.join(parts)
+
+
+def check_page_count(page_count: int, max_pages: int | None) -> None:
+    """Raise RenderBudgetExceeded if a laid out document has too many pages."""
+    if max_pages is not None and page_count > max_pages:
+        raise RenderBudgetExceeded(
+            'max_pages',
+            f'Document has {page_count} pages, limit is {max_pages}',
+        )
+
+
+@contextmanager
+def enforce_budget(budget: dict):
+    """
+    Enforce the time and memory limits of a budget on the enclosed code.
+
+    A SIGALRM timer checks the elapsed time and the RSS growth since
+    entry every CHECK_INTERVAL seconds and raises RenderBudgetExceeded
+    from the rendering code. Signals can only be handled in the main
+    thread, so elsewhere the limits are checked once on exit.
+
+    Args:
+        budget: Render budget (see get_render_budget)
+    """
+    max_seconds = budget.get('max_seconds')
+    max_memory_mb = budget.get('max_memory_mb')
+    started = time.monotonic()
+    base_rss = current_rss()
+
+    def check(*args) -> None:
+        elapsed = time.monotonic() - started
+        if max_seconds is not None and elapsed > max_seconds:
+            raise RenderBudgetExceeded(
+                'max_seconds',
+                f'Render exceeded {max_seconds} seconds',
+            )
+
+        if max_memory_mb is not None:
+            grown_mb = (current_rss() - base_rss) / (1024 * 1024)
+            if grown_mb > max_memory_mb:
+                raise RenderBudgetExceeded(
+                    'max_memory_mb',
+                    f'Render allocated {grown_mb:.0f} MB, limit is {max_memory_mb} MB',
+                )
+
+    if max_seconds is None and max_memory_mb is None:
+        yield
+        return
+
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        check()
+        return
+
+    previous_handler = signal.signal(signal.SIGALRM, check)
+    signal.setitimer(signal.ITIMER_REAL, CHECK_INTERVAL, CHECK_INTERVAL)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
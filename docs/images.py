@@ -0,0 +1,212 @@
+"""
+Payload images resolved against the local asset store.
+
+A payload references an image in DOCUMENT_ASSETS_DIR with an object::
+
+    {"logo": {"$image": "logos/acme.png", "width_mm": 40}}
+
+``width_mm`` and ``height_mm`` are both optional; the image keeps its
+aspect ratio inside the box they define. The ``$image`` key cannot be
+mistaken for ordinary payload data. The source is resized (never
+enlarged) to the pixels the box needs at IMAGE_RESIZE_DPI and
+recompressed once per content hash and size; an image without a size
+is drawn at IMAGE_RESIZE_DPI. Results are written to
+IMAGE_CACHE_DIR, which every worker process and every job shares.
+
+DOCX templates receive these references as docxtpl ``InlineImage``
+objects (``{{ logo }}`` in the document). HTML templates pass them, or
+a plain asset path, through the ``image`` filter, which returns the URL
+of the resized file::
+
+    <img src="{{ logo | image }}">
+    <img src="{{ 'logos/acme.png' | image(width_mm=40) }}">
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from docx.shared import Mm
+from docxtpl import InlineImage
+from PIL import Image, ImageOps
+from weasyprint.urls import path2url
+
+logger = logging.getLogger(__name__)
+
+MM_PER_INCH = 25.4
+
+# Key of the objects that reference an asset image
+IMAGE_KEY = '$image'
+
+# (path, mtime_ns, size) -> sha256 digest of the source
+_digests: dict[tuple[str, int, int], str] = {}
+
+# (digest, box width px, box height px) -> resized file
+_resized: dict[tuple[str, int, int], Path] = {}
+
+
+def is_image_reference(value) -> bool:
+    """Return True if a payload value references an asset image."""
+    return isinstance(value, dict) and isinstance(value.get(IMAGE_KEY), str)
+
+
+def resolve_image(
+    reference: str,
+    width_mm: float | None = None,
+    height_mm: float | None = None,
+) -> Path:
+    """
+    Return the resized copy of an asset image, creating it if needed.
+
+    Args:
+        reference: Path of the image relative to DOCUMENT_ASSETS_DIR
+        width_mm: Width of the box the image is drawn in
+        height_mm: Height of the box the image is drawn in
+
+    Returns:
+        Path of the resized image in IMAGE_CACHE_DIR
+    """
+    source = _asset_path(reference)
+    digest = _source_digest(source)
+    box = (
+        _pixels(width_mm) or settings.IMAGE_MAX_SIDE_PX,
+        _pixels(height_mm) or settings.IMAGE_MAX_SIDE_PX,
+    )
+
+    key = (digest, *box)
+    cached = _resized.get(key)
+    if cached is not None and cached.exists():
+        return cached
+
+    with Image.open(source) as original:
+        has_alpha = original.mode in ('RGBA', 'LA', 'P') or 'transparency' in original.info
+        extension = 'png' if has_alpha or original.format == 'PNG' else 'jpg'
+
+        name = (
+            f'{digest[:32]}-{box[0]}x{box[1]}-{settings.IMAGE_RESIZE_DPI}dpi'
+            f'-q{settings.IMAGE_JPEG_QUALITY}.{extension}'
+        )
+        cache_path = Path(settings.IMAGE_CACHE_DIR) / name
+        if not cache_path.exists():
+            _write_resized(original, cache_path, box, extension)
+            logger.info('Image resized: %s -> %s', reference, cache_path.name)
+
+    _resized[key] = cache_path
+    return cache_path
+
+
+def image(value, width_mm: float | None = None, height_mm: float | None = None) -> str:
+    """
+    Jinja2 filter: URL of the resized copy of an asset image.
+
+    Args:
+        value: Image reference object, or a path relative to
+            DOCUMENT_ASSETS_DIR
+        width_mm: Box width (overrides the reference's ``width_mm``)
+        height_mm: Box height (overrides the reference's ``height_mm``)
+
+    Returns:
+        file: URL accepted by the PDF asset fetcher
+    """
+    if is_image_reference(value):
+        width_mm = width_mm or value.get('width_mm')
+        height_mm = height_mm or value.get('height_mm')
+        value = value[IMAGE_KEY]
+
+    return path2url(str(resolve_image(str(value), width_mm, height_mm)))
+
+
+def inline_images(doc, context):
+    """
+    Replace the image references of a payload with docxtpl InlineImages.
+
+    Args:
+        doc: DocxTemplate the images are inserted into
+        context: Payload (dicts and lists are walked recursively)
+
+    Returns:
+        Copy of the payload with InlineImage objects
+    """
+    if is_image_reference(context):
+        width_mm = context.get('width_mm')
+        height_mm = context.get('height_mm')
+        path = resolve_image(context[IMAGE_KEY], width_mm, height_mm)
+
+        if width_mm and height_mm:
+            # Fit the box: the width follows from the binding side
+            with Image.open(path) as resized:
+                width_mm = min(float(width_mm), float(height_mm) * resized.width / resized.height)
+        elif not width_mm and not height_mm:
+            # Without a box, the resized pixels are drawn at IMAGE_RESIZE_DPI
+            with Image.open(path) as resized:
+                width_mm = resized.width / settings.IMAGE_RESIZE_DPI * MM_PER_INCH
+
+        return InlineImage(
+            doc,
+            str(path),
+            width=Mm(width_mm) if width_mm else None,
+            height=Mm(height_mm) if height_mm and not width_mm else None,
+        )
+
+    if isinstance(context, dict):
+        return {key: inline_images(doc, value) for key, value in context.items()}
+
+    if isinstance(context, list):
+        return [inline_images(doc, value) for value in context]
+
+    return context
+
+
+def _asset_path(reference: str) -> Path:
+    assets_dir = Path(settings.DOCUMENT_ASSETS_DIR).resolve()
+    path = (assets_dir / reference).resolve()
+    if not path.is_relative_to(assets_dir) or not path.is_file():
+        raise ValueError(f'Image not found in the asset directory: {reference}')
+
+    return path
+
+
+def _source_digest(path: Path) -> str:
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+    digest = _digests.get(key)
+    if digest is None:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        _digests[key] = digest
+
+    return digest
+
+
+def _pixels(size_mm: float | None) -> int | None:
+    if not size_mm:
+        return None
+
+    return max(1, round(float(size_mm) / MM_PER_INCH * settings.IMAGE_RESIZE_DPI))
+
+
+def _write_resized(source: Image.Image, cache_path: Path, box: tuple[int, int], extension: str) -> None:
+    """Resize an image into its box and write it atomically."""
+    resized = ImageOps.exif_transpose(source)
+    # thumbnail() keeps the aspect ratio and never enlarges
+    resized.thumbnail(box, Image.Resampling.LANCZOS)
+
+    # Readers that size images by their resolution (python-docx) draw
+    # them at the size they were resized for
+    dpi = (settings.IMAGE_RESIZE_DPI, settings.IMAGE_RESIZE_DPI)
+
+    temp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+    if extension == 'png':
+        resized.save(temp_path, 'PNG', optimize=True, dpi=dpi)
+    else:
+        resized.convert('RGB').save(
+            temp_path,
+            'JPEG',
+            dpi=dpi,
+            quality=settings.IMAGE_JPEG_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+    os.replace(temp_path, cache_path)
@@ -0,0 +1,148 @@
+"""
+Streaming JSON output for generate_json_task.
+
+The output document is encoded piece by piece and written straight to a
+file in RENDER_SPOOL_DIR, optionally through gzip, so the encoded text
+of a large payload is never held in memory as a whole. Containers are
+streamed down to STREAM_DEPTH levels; anything deeper (one record of a
+list, for instance) is encoded at once by the C encoder.
+
+Options (JSON_OUTPUT_OPTIONS, with DOCUMENT_JSON_OUTPUT_OPTIONS
+overrides per template):
+
+- ``compact``: no indentation or spaces between items
+- ``gzip``: write a .json.gz file
+- ``reference_input``: point at the stored input of the job instead of
+  copying it into the output
+"""
+
+import gzip
+import io
+import json
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+from django.conf import settings
+
+# Container levels encoded item by item
+STREAM_DEPTH = 4
+
+# Text buffered before each write to the file
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def resolve_json_options(template_name: str) -> dict:
+    """
+    Return the JSON output options of a template.
+
+    Args:
+        template_name: Template identifier
+
+    Returns:
+        JSON_OUTPUT_OPTIONS updated with the template overrides
+    """
+    return {
+        **settings.JSON_OUTPUT_OPTIONS,
+        **settings.DOCUMENT_JSON_OUTPUT_OPTIONS.get(template_name, {}),
+    }
+
+
+def iter_json(
+    value,
+    indent: int | None = None,
+    sort_keys: bool = False,
+    default=None,
+) -> Iterator[str]:
+    """
+    Encode a value as JSON text, in chunks.
+
+    The concatenated chunks equal json.dumps() with the same arguments,
+    ensure_ascii=False and compact separators when indent is None.
+
+    Args:
+        value: JSON-serialisable value
+        indent: Indentation width, or None for compact output
+        sort_keys: Sort the keys of every object
+        default: Called for objects that are not serialisable
+
+    Yields:
+        JSON text chunks
+    """
+    encoder = json.JSONEncoder(
+        ensure_ascii=False,
+        indent=indent,
+        sort_keys=sort_keys,
+        separators=(',', ':') if indent is None else (',', ': '),
+        default=default,
+    )
+    return _iter_value(value, encoder, STREAM_DEPTH, 0)
+
+
+def write_json(document: dict, options: dict) -> Path:
+    """
+    Write a JSON document to a file in RENDER_SPOOL_DIR.
+
+    Args:
+        document: Output document
+        options: JSON output options (see resolve_json_options())
+
+    Returns:
+        Path of the file, to be handed to save_output_file()
+    """
+    suffix = '.json.gz' if options['gzip'] else '.json'
+    descriptor, spool_path = tempfile.mkstemp(suffix=suffix, dir=settings.RENDER_SPOOL_DIR)
+
+    try:
+        with os.fdopen(descriptor, 'wb') as raw:
+            binary = (
+                gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=settings.JSON_OUTPUT_GZIP_LEVEL)
+                if options['gzip'] else raw
+            )
+            with binary, io.TextIOWrapper(binary, encoding='utf-8') as output:
+                pending: list[str] = []
+                size = 0
+                for chunk in iter_json(document, indent=None if options['compact'] else 2):
+                    pending.append(chunk)
+                    size += len(chunk)
+                    if size >= WRITE_BUFFER_SIZE:
+                        output.write(''.join(pending))
+                        pending.clear()
+                        size = 0
+                output.write(''.join(pending))
+    except BaseException:
+        os.remove(spool_path)
+        raise
+
+    return Path(spool_path)
+
+
+def _iter_value(value, encoder: json.JSONEncoder, depth: int, level: int) -> Iterator[str]:
+    if not depth or not value or not isinstance(value, (dict, list)):
+        text = encoder.encode(value)
+        if encoder.indent and level:
+            # Nested output of the encoder starts at column 0
+            text = text.replace('\n', '\n' + ' ' * (encoder.indent * level))
+        yield text
+        return
+
+    if encoder.indent:
+        newline = '\n' + ' ' * (encoder.indent * (level + 1))
+        closing = '\n' + ' ' * (encoder.indent * level)
+    else:
+        newline = closing = ''
+
+    if isinstance(value, dict):
+        yield '{'
+        for index, key in enumerate(sorted(value) if encoder.sort_keys else value):
+            separator = encoder.item_separator if index else ''
+            yield f'{separator}{newline}{encoder.encode(key)}{encoder.key_separator}'
+            yield from _iter_value(value[key], encoder, depth - 1, level + 1)
+        yield closing + '}'
+    else:
+        yield '['
+        for index, item in enumerate(value):
+            yield (encoder.item_separator if index else '') + newline
+            yield from _iter_value(item, encoder, depth - 1, level + 1)
+        yield closing + ']'
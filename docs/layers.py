@@ -0,0 +1,160 @@
+"""
+Layered PDF rendering for mostly static templates.
+
+A layered template is split into two HTML templates sharing a
+fixed-position stylesheet: a static background, laid out once per
+template version and cached as a PDF, and an overlay holding only the
+dynamic fields. Each job lays out the small overlay and stamps it onto
+the cached background page.
+"""
+
+import json
+import logging
+import os
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from pypdf import PageObject, PdfReader, PdfWriter
+from weasyprint import CSS, HTML
+
+from .governor import check_page_count
+from .pdf import fetch_asset, get_base_url, get_font_config, load_stylesheets
+from .render_cache import digest_sources, file_fingerprint, fingerprint_assets, fingerprint_templates
+from .rendering import render_html
+
+logger = logging.getLogger(__name__)
+
+# (template_name, layer version) -> background page
+_backgrounds: dict[tuple[str, str], PageObject] = {}
+
+
+def is_layered(template_name: str) -> bool:
+    """Return True if the template is declared in LAYERED_TEMPLATES."""
+    return template_name in settings.LAYERED_TEMPLATES
+
+
+def render_layered_pdf(
+    template_name: str,
+    context: dict,
+    options: dict | None = None,
+    budget: dict | None = None,
+) -> bytes:
+    """
+    Render a layered template: cached background plus dynamic overlay.
+
+    Both layers are written with the same output profile options; the
+    background is cached per profile.
+
+    Args:
+        template_name: Template identifier declared in LAYERED_TEMPLATES
+        context: Context data for the overlay
+        options: WeasyPrint options of the output profile
+        budget: Render budget of the template; max_html_chars applies to
+            the overlay, max_pages to the document
+
+    Returns:
+        PDF binary content
+    """
+    layers = settings.LAYERED_TEMPLATES[template_name]
+    options = options or {}
+    budget = budget or {}
+    stylesheets = load_stylesheets(_stylesheet_paths(layers))
+    background = _get_background(template_name, layers, stylesheets, options)
+
+    overlay = PdfReader(BytesIO(_layout(
+        layers['overlay'],
+        context,
+        stylesheets,
+        options,
+        max_chars=budget.get('max_html_chars'),
+    )))
+    check_page_count(len(overlay.pages), budget.get('max_pages'))
+
+    writer = PdfWriter(clone_from=overlay)
+    for page in writer.pages:
+        page.merge_page(background, over=False)
+
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def layer_version(template_name: str, options: dict | None = None) -> str:
+    """
+    Hash the sources of the static layer of a template.
+
+    Covers the background and every template it extends or includes,
+    the layer stylesheets, the asset directory and the options, like
+    the version of a composite section (composite.section_version).
+
+    Args:
+        template_name: Template identifier declared in LAYERED_TEMPLATES
+        options: WeasyPrint options the background is written with
+
+    Returns:
+        Hex digest that changes whenever the background must be rebuilt
+    """
+    layers = settings.LAYERED_TEMPLATES[template_name]
+
+    sources = fingerprint_templates([layers['background']])
+    for path in _stylesheet_paths(layers):
+        sources[f'css:{path.name}'] = file_fingerprint(path)[0]
+    sources.update(fingerprint_assets())
+    sources['options'] = json.dumps(options or {}, sort_keys=True)
+
+    return digest_sources(sources)
+
+
+def _get_background(
+    template_name: str,
+    layers: dict,
+    stylesheets: list[CSS],
+    options: dict,
+) -> PageObject:
+    """
+    Return the background page for a template, building it if needed.
+
+    The PDF is stored in LAYER_CACHE_DIR under its layer version, so every
+    worker process on the node lays it out at most once per version.
+    """
+    version = layer_version(template_name, options)
+    cached = _backgrounds.get((template_name, version))
+    if cached is not None:
+        return cached
+
+    cache_path = Path(settings.LAYER_CACHE_DIR) / f'{template_name}-{version[:16]}.pdf'
+    if not cache_path.exists():
+        pdf_bytes = _layout(layers['background'], {}, stylesheets, options)
+
+        temp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        temp_path.write_bytes(pdf_bytes)
+        os.replace(temp_path, cache_path)
+        logger.info('Static layer rendered: %s', cache_path.name)
+
+    background = PdfReader(BytesIO(cache_path.read_bytes())).pages[0]
+    # Drop backgrounds of older versions of this template
+    for key in [key for key in _backgrounds if key[0] == template_name]:
+        del _backgrounds[key]
+    _backgrounds[(template_name, version)] = background
+    return background
+
+
+def _layout(
+    template_file: str,
+    context: dict,
+    stylesheets: list[CSS],
+    options: dict,
+    max_chars: int | None = None,
+) -> bytes:
+    html = HTML(
+        string=render_html(template_file, context, max_chars=max_chars),
+        base_url=get_base_url(),
+        url_fetcher=fetch_asset,
+    )
+
+    return html.write_pdf(stylesheets=stylesheets, font_config=get_font_config(), **options)
+
+
+def _stylesheet_paths(layers: dict) -> list[Path]:
+    return [settings.TEMPLATES_DOC_DIR / path for path in layers.get('stylesheets', [])]
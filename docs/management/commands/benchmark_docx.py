@@ -0,0 +1,176 @@
+"""
+Django management command to benchmark DOCX rendering.
+
+Each DOCX template is rendered with its example payload
+(example_<name>.json, or docx_example.json).
+
+Usage:
+    python manage.py benchmark_docx
+    python manage.py benchmark_docx --mode templates --iterations 200
+    python manage.py benchmark_docx --mode save
+"""
+
+import json
+import time
+import tracemalloc
+from io import BytesIO
+from zipfile import ZipFile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from docxtpl import DocxTemplate
+
+from docs.docx_templates import get_docx_template
+from docs.rendering import resolve_template_file
+
+
+class Command(BaseCommand):
+    help = "Benchmark DOCX rendering strategies"
+
+    MODES = ["templates", "save"]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            choices=self.MODES,
+            default=self.MODES[0],
+            help="Rendering strategy to benchmark",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=50,
+            help="Documents rendered per template and strategy",
+        )
+        parser.add_argument(
+            "--template",
+            action="append",
+            help="Template to benchmark (repeatable, default: all DOCX templates)",
+        )
+
+    def handle(self, *args, **options):
+        templates = self._get_templates(options["template"])
+        iterations = options["iterations"]
+
+        getattr(self, f"_benchmark_{options['mode']}")(templates, iterations)
+
+    # =========================
+    # Benchmarks
+    # =========================
+    def _benchmark_templates(self, templates, iterations):
+        """DocxTemplate opened and compiled per job vs. the per-process template cache."""
+        self.stdout.write(
+            f"{'Template':<16}{'Per job ms':>12}{'Cached ms':>12}{'Docs/s':>10}{'Speed-up':>10}"
+        )
+
+        for template_name in templates:
+            context = self._load_example(template_name)
+            template_path = settings.TEMPLATES_DOC_DIR / f"{template_name}.docx"
+
+            def render_uncached():
+                doc = DocxTemplate(str(template_path))
+                doc.render(context, autoescape=True)
+                doc.save(BytesIO())
+
+            def render_cached():
+                doc = get_docx_template(template_path)
+                doc.render(context, autoescape=True)
+                doc.save(BytesIO())
+
+            uncached_ms = self._time(render_uncached, iterations)
+            cached_ms = self._time(render_cached, iterations)
+
+            self.stdout.write(
+                f"{template_name:<16}{uncached_ms:>12.1f}{cached_ms:>12.1f}"
+                f"{1000 / cached_ms:>10.1f}{uncached_ms / cached_ms:>9.1f}x"
+            )
+
+    def _benchmark_save(self, templates, iterations):
+        """python-docx writing every zip member vs. copying the unchanged ones as stored."""
+        self.stdout.write(
+            f"{'Template':<16}{'Rewrite ms':>12}{'Copy ms':>10}{'Rewrite MB':>12}{'Copy MB':>10}"
+        )
+
+        for template_name in templates:
+            context = self._load_example(template_name)
+            doc = get_docx_template(settings.TEMPLATES_DOC_DIR / f"{template_name}.docx")
+            doc.render(context, autoescape=True)
+            self._verify_package(doc, template_name)
+
+            def save_rewrite():
+                DocxTemplate.save(doc, BytesIO())
+
+            def save_copy():
+                doc.save(BytesIO())
+
+            rewrite_ms = self._time(save_rewrite, iterations)
+            copy_ms = self._time(save_copy, iterations)
+
+            self.stdout.write(
+                f"{template_name:<16}{rewrite_ms:>12.1f}{copy_ms:>10.1f}"
+                f"{self._peak_mb(save_rewrite):>12.1f}{self._peak_mb(save_copy):>10.1f}"
+            )
+
+    # =========================
+    # Helpers
+    # =========================
+    @staticmethod
+    def _get_templates(selected):
+        docx_templates = [
+            name
+            for name in settings.SUPPORTED_DOCUMENT_TYPES
+            if resolve_template_file(name).endswith(".docx")
+        ]
+
+        if not selected:
+            return docx_templates
+
+        unknown = set(selected) - set(docx_templates)
+        if unknown:
+            raise CommandError(f"Unknown DOCX templates: {', '.join(sorted(unknown))}")
+
+        return selected
+
+    @staticmethod
+    def _load_example(template_name):
+        for example_path in (
+            settings.BASE_DIR / f"example_{template_name}.json",
+            settings.BASE_DIR / "docx_example.json",
+        ):
+            if example_path.exists():
+                return json.loads(example_path.read_text(encoding="utf-8"))
+
+        return {}
+
+    @staticmethod
+    def _verify_package(doc, template_name):
+        """Check that the copied package is a valid zip with intact members."""
+        output = BytesIO()
+        doc.save(output)
+
+        with ZipFile(output) as package:
+            bad_member = package.testzip()
+
+        if bad_member is not None:
+            raise CommandError(f"{template_name}: corrupt member {bad_member} in saved package")
+
+    @staticmethod
+    def _time(render, iterations):
+        """Return the mean wall time in milliseconds, after one warm-up run."""
+        render()
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            render()
+
+        return (time.perf_counter() - start) * 1000 / iterations
+
+    @staticmethod
+    def _peak_mb(render):
+        """Return the peak memory allocated by one run, in megabytes."""
+        tracemalloc.start()
+        try:
+            render()
+            return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
@@ -0,0 +1,334 @@
+"""
+Django management command to benchmark PDF rendering of the HTML templates.
+
+Each template is rendered with its example payload (example_<name>.json).
+
+Usage:
+    python manage.py benchmark_render
+    python manage.py benchmark_render --mode stylesheets --iterations 50
+    python manage.py benchmark_render --mode layers --template certificate
+    python manage.py benchmark_render --mode profiles --iterations 5
+    python manage.py benchmark_render --mode pool --iterations 1000
+    python manage.py benchmark_render --mode renderers --iterations 100
+    python manage.py benchmark_render --mode codes --iterations 1000
+    python manage.py benchmark_render --mode pagination --template invoice
+    python manage.py benchmark_render --template invoice
+"""
+
+import json
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from pypdf import PdfReader
+from weasyprint import HTML
+
+from docs.canvas import has_layout
+from docs.codes import barcode, qr_code
+from docs.governor import get_render_budget
+from docs.layers import is_layered, render_layered_pdf
+from docs.pdf import fetch_asset, get_base_url, get_font_config, get_stylesheets
+from docs.render_pool import RenderPool
+from docs.rendering import (
+    render_html,
+    resolve_output_profile,
+    resolve_renderer,
+    resolve_stylesheets,
+    resolve_template_file,
+)
+from docs.tasks import _render_pdf, _render_weasyprint_pdf
+
+
+class Command(BaseCommand):
+    help = "Benchmark PDF rendering strategies for the HTML templates"
+
+    MODES = ["stylesheets", "layers", "profiles", "pool", "renderers", "codes", "pagination"]
+
+    # Line items rendered by the pagination benchmark
+    PAGINATION_SIZES = [1_000, 10_000, 100_000]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            choices=self.MODES,
+            default=self.MODES[0],
+            help="Rendering strategy to benchmark",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=20,
+            help="Documents rendered per template and strategy",
+        )
+        parser.add_argument(
+            "--template",
+            action="append",
+            help="Template to benchmark (repeatable, default: all HTML templates)",
+        )
+
+    def handle(self, *args, **options):
+        templates = self._get_templates(options["template"])
+        iterations = options["iterations"]
+
+        getattr(self, f"_benchmark_{options['mode']}")(templates, iterations)
+
+    # =========================
+    # Benchmarks
+    # =========================
+    def _benchmark_stylesheets(self, templates, iterations):
+        """Inline <style> parsed per document vs. shared pre-parsed CSS."""
+        self.stdout.write(
+            f"{'Template':<14}{'Inline ms':>12}{'Shared ms':>12}{'Saved ms':>12}{'Saved':>8}"
+        )
+
+        for template_name in templates:
+            html = render_html(template_name, self._load_example(template_name))
+            css = "".join(path.read_text() for path in resolve_stylesheets(template_name))
+            inline_html = html.replace("</head>", f"<style>{css}</style></head>", 1)
+            stylesheets = get_stylesheets(template_name)
+            font_config = get_font_config()
+
+            inline_ms = self._time(
+                lambda: HTML(string=inline_html, base_url="/").write_pdf(
+                    font_config=font_config,
+                ),
+                iterations,
+            )
+            shared_ms = self._time(
+                lambda: HTML(string=html, base_url="/").write_pdf(
+                    stylesheets=stylesheets,
+                    font_config=font_config,
+                ),
+                iterations,
+            )
+
+            saved_ms = inline_ms - shared_ms
+            self.stdout.write(
+                f"{template_name:<14}{inline_ms:>12.1f}{shared_ms:>12.1f}"
+                f"{saved_ms:>12.1f}{saved_ms / inline_ms:>8.1%}"
+            )
+
+    def _benchmark_layers(self, templates, iterations):
+        """Full layout per document vs. cached background + overlay."""
+        self.stdout.write(f"{'Template':<14}{'Full ms':>12}{'Layered ms':>12}{'Speed-up':>10}")
+
+        for template_name in templates:
+            if template_name not in settings.LAYERED_TEMPLATES:
+                self.stdout.write(f"{template_name:<14}{'(not layered)':>34}")
+                continue
+
+            context = self._load_example(template_name)
+            stylesheets = get_stylesheets(template_name)
+            font_config = get_font_config()
+
+            full_ms = self._time(
+                lambda: HTML(
+                    string=render_html(template_name, context),
+                    base_url=get_base_url(),
+                    url_fetcher=fetch_asset,
+                ).write_pdf(stylesheets=stylesheets, font_config=font_config),
+                iterations,
+            )
+            layered_ms = self._time(
+                lambda: render_layered_pdf(template_name, context),
+                iterations,
+            )
+
+            self.stdout.write(
+                f"{template_name:<14}{full_ms:>12.1f}{layered_ms:>12.1f}"
+                f"{full_ms / layered_ms:>9.1f}x"
+            )
+
+    def _benchmark_profiles(self, templates, iterations):
+        """Output size and render time of every PDF output profile."""
+        self.stdout.write(
+            f"{'Template':<14}{'Profile':<12}{'Size KB':>10}{'vs std':>8}{'ms':>10}"
+        )
+
+        for template_name in templates:
+            context = self._load_example(template_name)
+            baseline = None
+
+            for profile_name, options in settings.PDF_OUTPUT_PROFILES.items():
+                if is_layered(template_name):
+                    render = lambda: render_layered_pdf(template_name, context, options)  # noqa: E731
+                else:
+                    html = render_html(template_name, context)
+                    stylesheets = get_stylesheets(template_name)
+                    render = lambda: HTML(  # noqa: E731
+                        string=html,
+                        base_url=get_base_url(),
+                        url_fetcher=fetch_asset,
+                    ).write_pdf(
+                        stylesheets=stylesheets,
+                        font_config=get_font_config(),
+                        **options,
+                    )
+
+                size_kb = len(render()) / 1024
+                baseline = baseline or size_kb
+                elapsed_ms = self._time(render, iterations)
+
+                self.stdout.write(
+                    f"{template_name:<14}{profile_name:<12}{size_kb:>10.1f}"
+                    f"{size_kb / baseline:>8.0%}{elapsed_ms:>10.1f}"
+                )
+
+    def _benchmark_pool(self, templates, iterations):
+        """In-process rendering vs. the render subprocess pool, with recycling."""
+        self.stdout.write(
+            f"{'Template':<14}{'Inline ms':>12}{'Pool ms':>12}{'Overhead ms':>14}"
+        )
+        pool = RenderPool(1)
+
+        try:
+            for template_name in templates:
+                context = self._load_example(template_name)
+                options = resolve_output_profile(template_name)[1]
+
+                inline_ms = self._time(
+                    lambda: _render_pdf(template_name, context, options),
+                    iterations,
+                )
+                pool_ms = self._time(
+                    lambda: pool.run(_render_pdf, template_name, context, options),
+                    iterations,
+                )
+
+                self.stdout.write(
+                    f"{template_name:<14}{inline_ms:>12.1f}{pool_ms:>12.1f}"
+                    f"{pool_ms - inline_ms:>14.1f}"
+                )
+        finally:
+            pool.close()
+
+    def _benchmark_renderers(self, templates, iterations):
+        """Render time and size of every renderer backend able to draw a template."""
+        self.stdout.write(
+            f"{'Template':<14}{'Renderer':<14}{'Size KB':>10}{'ms':>10}{'Speed-up':>10}"
+        )
+
+        for template_name in templates:
+            context = self._load_example(template_name)
+            options = resolve_output_profile(template_name)[1]
+            budget = get_render_budget(template_name)
+            selected = resolve_renderer(template_name)
+            baseline = None
+
+            for renderer_name, path in settings.PDF_RENDERERS.items():
+                if renderer_name == "canvas" and not has_layout(template_name):
+                    continue
+
+                renderer = import_string(path)
+                render = lambda: renderer(template_name, context, options, budget)  # noqa: E731
+
+                size_kb = len(render()) / 1024
+                elapsed_ms = self._time(render, iterations)
+                baseline = baseline or elapsed_ms
+                label = f"{renderer_name}{' *' if renderer_name == selected else ''}"
+
+                self.stdout.write(
+                    f"{template_name:<14}{label:<14}{size_kb:>10.1f}{elapsed_ms:>10.1f}"
+                    f"{baseline / elapsed_ms:>9.1f}x"
+                )
+
+        self.stdout.write("* renderer selected in SUPPORTED_DOCUMENT_TYPES")
+
+    def _benchmark_codes(self, templates, iterations):
+        """Per-document cost of the QR code and barcode filters, new vs. cached values."""
+        self.stdout.write(f"{'Code':<14}{'New ms':>12}{'Cached ms':>12}")
+
+        codes = [
+            ("qr svg", lambda value: qr_code(value)),
+            ("qr png", lambda value: qr_code(value, output_format="png")),
+            ("barcode", lambda value: barcode(value)),
+        ]
+        counter = iter(range(10**9))
+
+        for label, generate in codes:
+            new_ms = self._time(
+                lambda: generate(f"https://example.com/verify/CERT-{next(counter):09d}"),
+                iterations,
+            )
+            cached_ms = self._time(
+                lambda: generate("https://example.com/verify/CERT-000000000"),
+                iterations,
+            )
+
+            self.stdout.write(f"{label:<14}{new_ms:>12.3f}{cached_ms:>12.3f}")
+
+    def _benchmark_pagination(self, templates, iterations):
+        """Render time of pre-paginated tables as the row count grows (one run per size)."""
+        self.stdout.write(
+            f"{'Template':<14}{'Rows':>10}{'Pages':>8}{'Seconds':>10}{'ms/1k rows':>12}"
+        )
+
+        for template_name in templates:
+            if template_name not in settings.PAGINATED_TABLES:
+                self.stdout.write(f"{template_name:<14}{'(not paginated)':>40}")
+                continue
+
+            context = self._load_example(template_name)
+            rows_key = settings.CHUNKED_TEMPLATES.get(template_name, {}).get("rows_key", "items")
+            sample_rows = context.get(rows_key) or [{}]
+            options = resolve_output_profile(template_name)[1]
+            # Only the render is measured: no page or time limits
+            budget = dict.fromkeys(get_render_budget(template_name))
+
+            for size in self.PAGINATION_SIZES:
+                rows = [sample_rows[index % len(sample_rows)] for index in range(size)]
+                start = time.perf_counter()
+                pdf_bytes = _render_weasyprint_pdf(
+                    template_name,
+                    {**context, rows_key: rows},
+                    options,
+                    budget,
+                )
+                elapsed = time.perf_counter() - start
+                pages = len(PdfReader(BytesIO(pdf_bytes)).pages)
+
+                self.stdout.write(
+                    f"{template_name:<14}{size:>10}{pages:>8}{elapsed:>10.1f}"
+                    f"{elapsed * 1000 / (size / 1000):>12.0f}"
+                )
+
+    # =========================
+    # Helpers
+    # =========================
+    @staticmethod
+    def _get_templates(selected):
+        html_templates = [
+            name
+            for name in settings.SUPPORTED_DOCUMENT_TYPES
+            if resolve_template_file(name).endswith(".html.j2")
+        ]
+
+        if not selected:
+            return html_templates
+
+        unknown = set(selected) - set(html_templates)
+        if unknown:
+            raise CommandError(f"Unknown HTML templates: {', '.join(sorted(unknown))}")
+
+        return selected
+
+    @staticmethod
+    def _load_example(template_name):
+        example_path = settings.BASE_DIR / f"example_{template_name}.json"
+        if not example_path.exists():
+            return {}
+
+        return json.loads(example_path.read_text(encoding="utf-8"))
+
+    @staticmethod
+    def _time(render, iterations):
+        """Return the mean wall time in milliseconds, after one warm-up run."""
+        render()
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            render()
+
+        return (time.perf_counter() - start) * 1000 / iterations
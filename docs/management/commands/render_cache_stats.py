@@ -0,0 +1,33 @@
+"""
+Django management command to show render cache counters.
+
+Usage:
+    python manage.py render_cache_stats
+    python manage.py render_cache_stats --reset
+"""
+
+from django.core.management.base import BaseCommand
+
+from docs.render_cache import RenderCache
+
+
+class Command(BaseCommand):
+    help = "Show render cache hit/miss counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after printing them",
+        )
+
+    def handle(self, *args, **options):
+        stats = RenderCache.stats()
+
+        self.stdout.write(f"Hits:      {stats['hits']}")
+        self.stdout.write(f"Misses:    {stats['misses']}")
+        self.stdout.write(f"Hit ratio: {stats['hit_ratio']:.1%}")
+
+        if options["reset"]:
+            RenderCache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-16 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0004_documentjob_file_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentjob",
+            name="job_type",
+            field=models.CharField(
+                choices=[("SINGLE", "Documento único"), ("BATCH", "Lote de registros")],
+                default="SINGLE",
+                help_text="Single document or batch of records rendered in one pass",
+                max_length=20,
+                verbose_name="Job type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="documentjob",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Job this document was derived from",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="children",
+                to="docs.documentjob",
+                verbose_name="Parent job",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-16 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0005_documentjob_job_type_parent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentjob",
+            name="output_profile",
+            field=models.CharField(
+                blank=True,
+                help_text="PDF output profile used to write the document",
+                max_length=50,
+                null=True,
+                verbose_name="Output profile",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-16 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0006_documentjob_output_profile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentjob",
+            name="error_code",
+            field=models.CharField(
+                blank=True,
+                help_text="Machine-readable reason for failures that are not retried",
+                max_length=50,
+                null=True,
+                verbose_name="Error code",
+            ),
+        ),
+    ]
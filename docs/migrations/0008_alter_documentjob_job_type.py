@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-16 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0007_documentjob_error_code"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="documentjob",
+            name="job_type",
+            field=models.CharField(
+                choices=[
+                    ("SINGLE", "Documento único"),
+                    ("BATCH", "Lote de registros"),
+                    ("APPEND", "Anexo incremental"),
+                ],
+                default="SINGLE",
+                help_text=(
+                    "Single document, batch of records rendered in one pass, or "
+                    "records appended to the output of the parent job"
+                ),
+                max_length=20,
+                verbose_name="Job type",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-16 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("docs", "0008_alter_documentjob_job_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentjob",
+            name="output_format",
+            field=models.CharField(
+                blank=True,
+                help_text=(
+                    "Requested output format when it differs from the template "
+                    "format (PDF converted from a DOCX template)"
+                ),
+                max_length=10,
+                null=True,
+                verbose_name="Output format",
+            ),
+        ),
+    ]
@@ -28,6 +28,11 @@ class DocumentJob(models.Model):
         COMPLETED = 'COMPLETED', _('Completado')
         FAILED = 'FAILED', _('Fallido')
 
+    class JobType(models.TextChoices):
+        """Kinds of document jobs."""
+        SINGLE = 'SINGLE', _('Documento único')
+        BATCH = 'BATCH', _('Lote de registros')
+        APPEND = 'APPEND', _('Anexo incremental')
 
     # =========================
     # Identifiers
@@ -70,6 +75,46 @@ class DocumentJob(models.Model):
         help_text=_('Jinja2 template used to generate the document'),
     )
 
+    job_type = models.CharField(
+        max_length=20,
+        choices=JobType.choices,
+        default=JobType.SINGLE,
+        verbose_name=_('Job type'),
+        help_text=_(
+            'Single document, batch of records rendered in one pass, or '
+            'records appended to the output of the parent job'
+        ),
+    )
+
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='children',
+        verbose_name=_('Parent job'),
+        help_text=_('Job this document was derived from'),
+    )
+
+    output_profile = models.CharField(
+        max_length=50,
+        blank=True,
+        null=True,
+        verbose_name=_('Output profile'),
+        help_text=_('PDF output profile used to write the document'),
+    )
+
+    output_format = models.CharField(
+        max_length=10,
+        blank=True,
+        null=True,
+        verbose_name=_('Output format'),
+        help_text=_(
+            'Requested output format when it differs from the template '
+            'format (PDF converted from a DOCX template)'
+        ),
+    )
+
     # =========================
     # Files
     # =========================
@@ -107,6 +152,14 @@ class DocumentJob(models.Model):
         help_text=_('Error details if the job fails'),
     )
 
+    error_code = models.CharField(
+        max_length=50,
+        blank=True,
+        null=True,
+        verbose_name=_('Error code'),
+        help_text=_('Machine-readable reason for failures that are not retried'),
+    )
+
     # =========================
     # Timestamps
     # =========================
@@ -181,6 +234,18 @@ class DocumentJob(models.Model):
         """Return True if the job has failed."""
         return self.status == self.Status.FAILED
 
+    def is_batch(self) -> bool:
+        """Return True if the job renders a batch of records."""
+        return self.job_type == self.JobType.BATCH
+
+    def is_append(self) -> bool:
+        """Return True if the job appends records to its parent's output."""
+        return self.job_type == self.JobType.APPEND
+
+    def converts_to_pdf(self) -> bool:
+        """Return True if the job output is converted to PDF."""
+        return self.output_format == 'pdf'
+
     # =========================
     # State transitions
     # =========================
@@ -196,10 +261,15 @@ class DocumentJob(models.Model):
         self.completed_at = timezone.now()
         self.save(update_fields=['status', 'completed_at', 'updated_at'])
 
-    def mark_failed(self, error_message: str | None = None) -> None:
-        """Mark the job as failed and store the error message."""
+    def mark_failed(
+        self,
+        error_message: str | None = None,
+        error_code: str | None = None,
+    ) -> None:
+        """Mark the job as failed and store the error message and code."""
         self.status = self.Status.FAILED
         self.completed_at = timezone.now()
+        self.error_code = error_code
 
         if error_message:
             self.error_message = error_message
@@ -208,6 +278,7 @@ class DocumentJob(models.Model):
             update_fields=[
                 'status',
                 'error_message',
+                'error_code',
                 'completed_at',
                 'updated_at',
             ]
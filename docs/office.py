@@ -0,0 +1,294 @@
+"""
+Pool of persistent headless office processes for DOCX to PDF conversion.
+
+Starting LibreOffice takes seconds, so documents are not converted with
+one ``soffice --convert-to`` per job. Each worker process keeps up to
+OFFICE_POOL_SIZE ``unoserver`` instances (a running LibreOffice behind
+an XML-RPC interface), each with its own ports and user profile, and
+hands them the paths of the spooled files to convert.
+
+An instance is health-checked before use when it has been idle for
+OFFICE_HEALTH_CHECK_INTERVAL seconds, and replaced after
+OFFICE_MAX_CONVERSIONS conversions, when it exits, or when a conversion
+fails or exceeds OFFICE_CONVERSION_TIMEOUT.
+"""
+
+import logging
+import os
+import shlex
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from pathlib import Path
+from xmlrpc.client import Fault, ServerProxy, Transport
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OfficeConversionError(Exception):
+    """The office process failed, died or timed out during a conversion."""
+
+
+class _TimeoutTransport(Transport):
+    """XML-RPC transport with a socket timeout."""
+
+    def __init__(self, timeout: float) -> None:
+        super().__init__()
+        self.timeout = timeout
+
+    def make_connection(self, host) -> HTTPConnection:
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+class OfficeProcess:
+    """A single unoserver instance and its usage counters."""
+
+    def __init__(self) -> None:
+        self.conversions = 0
+        self.last_used = time.monotonic()
+        # True while a conversion has been sent and not answered
+        self.in_call = False
+        self.port = _free_port()
+        self.profile_dir = tempfile.mkdtemp(prefix='office-profile-')
+        try:
+            self.process = subprocess.Popen(
+                [
+                    *shlex.split(settings.OFFICE_SERVER_COMMAND),
+                    '--interface', '127.0.0.1',
+                    '--port', str(self.port),
+                    '--uno-port', str(_free_port()),
+                    '--user-installation', Path(self.profile_dir).as_uri(),
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                # Own process group, so soffice is stopped with its server
+                start_new_session=True,
+            )
+        except OSError as exc:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            raise OfficeConversionError(f'Cannot start office server: {exc}') from exc
+
+        deadline = time.monotonic() + settings.OFFICE_START_TIMEOUT
+        while not self.is_healthy():
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.close()
+                raise OfficeConversionError(
+                    f'Office process {self.process.pid} did not start'
+                )
+            time.sleep(0.5)
+
+        logger.info('Office process started (pid=%s, port=%s)', self.process.pid, self.port)
+
+    def convert(self, source: Path, target: Path, convert_to: str = 'pdf') -> None:
+        """
+        Convert a file on local disk into another local file.
+
+        Raises:
+            OfficeConversionError: If the conversion failed or timed out
+        """
+        self.in_call = True
+        try:
+            self._proxy(settings.OFFICE_CONVERSION_TIMEOUT).convert(
+                str(source),
+                None,
+                str(target),
+                convert_to,
+            )
+        except Fault as exc:
+            # The server answered: the document failed, the process is fine
+            self.in_call = False
+            raise OfficeConversionError(
+                f'Office process {self.process.pid} could not convert {source.name}: {exc.faultString}'
+            ) from exc
+        except OSError as exc:
+            raise OfficeConversionError(
+                f'Office process {self.process.pid} failed or timed out converting {source.name}'
+            ) from exc
+        finally:
+            self.conversions += 1
+            self.last_used = time.monotonic()
+
+        self.in_call = False
+
+    def is_healthy(self) -> bool:
+        """Return True if the process is running and answers a status call."""
+        if self.process.poll() is not None:
+            return False
+
+        try:
+            self._proxy(5).info()
+        except (OSError, Fault):
+            return False
+
+        return True
+
+    def is_exhausted(self) -> bool:
+        """Return True once the process should be replaced."""
+        return (
+            self.conversions >= settings.OFFICE_MAX_CONVERSIONS
+            or self.process.poll() is not None
+        )
+
+    def close(self) -> None:
+        """Stop the server and its office process, killing them if needed."""
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout=10)
+        except ProcessLookupError:
+            pass
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def _proxy(self, timeout: float) -> ServerProxy:
+        return ServerProxy(
+            f'http://127.0.0.1:{self.port}',
+            transport=_TimeoutTransport(timeout),
+            allow_none=True,
+        )
+
+
+class OfficePool:
+    """
+    Fixed-size pool of OfficeProcess instances for one worker process.
+
+    Processes are started lazily (or by start()) and reused across jobs;
+    one that fails, exits or is exhausted is closed and replaced on the
+    next conversion.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._idle: list[OfficeProcess] = []
+        self._busy = 0
+        self._condition = threading.Condition()
+
+    def start(self) -> None:
+        """Start every office process up front, so they are warm for the first job."""
+        with self._condition:
+            while len(self._idle) + self._busy < self.size:
+                self._idle.append(OfficeProcess())
+
+    def convert(self, source: Path, target: Path, convert_to: str = 'pdf') -> None:
+        """
+        Convert a file with an office process of the pool.
+
+        Args:
+            source: Path of the document to convert
+            target: Path to write the converted document to
+            convert_to: Target format (extension)
+        """
+        process = self._acquire()
+
+        try:
+            process.convert(source, target, convert_to)
+        finally:
+            self._release(process)
+
+    def close(self) -> None:
+        """Stop the idle office processes."""
+        with self._condition:
+            while self._idle:
+                self._idle.pop().close()
+
+    def _acquire(self) -> OfficeProcess:
+        with self._condition:
+            while not self._idle and self._busy >= self.size:
+                self._condition.wait()
+
+            self._busy += 1
+            process = self._idle.pop() if self._idle else None
+
+        try:
+            idle_for = time.monotonic() - process.last_used if process else 0
+            if process and idle_for > settings.OFFICE_HEALTH_CHECK_INTERVAL and not process.is_healthy():
+                logger.warning('Office process unhealthy, replacing it (pid=%s)', process.process.pid)
+                process.close()
+                process = None
+
+            return process or OfficeProcess()
+        except BaseException:
+            with self._condition:
+                self._busy -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, process: OfficeProcess) -> None:
+        # A process interrupted mid-conversion (crash, timeout, soft time
+        # limit) is in an unknown state
+        if process.in_call or process.is_exhausted():
+            logger.info(
+                'Recycling office process (pid=%s, conversions=%d)',
+                process.process.pid,
+                process.conversions,
+            )
+            process.close()
+            process = None
+
+        with self._condition:
+            self._busy -= 1
+            if process is not None:
+                self._idle.append(process)
+            self._condition.notify()
+
+
+_pool: OfficePool | None = None
+
+
+def get_office_pool() -> OfficePool:
+    """Return the office pool of this worker process, creating it on first use."""
+    global _pool
+
+    if _pool is None:
+        _pool = OfficePool(settings.OFFICE_POOL_SIZE)
+
+    return _pool
+
+
+def convert_to_pdf(source: Path) -> Path:
+    """
+    Convert a spooled document to PDF next to it, then remove the source.
+
+    Args:
+        source: Path of the document in RENDER_SPOOL_DIR
+
+    Returns:
+        Path of the PDF, to be handed to save_output_file()
+    """
+    target = source.with_suffix('.pdf')
+    try:
+        get_office_pool().convert(source, target)
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    finally:
+        source.unlink(missing_ok=True)
+
+    return target
+
+
+def close_office_pool() -> None:
+    """Stop the office processes of this worker process."""
+    global _pool
+
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+def _free_port() -> int:
+    """Return a TCP port on the loopback interface that is free right now."""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
@@ -0,0 +1,118 @@
+"""
+Pre-paginated tables for templates with long row lists.
+
+WeasyPrint slows down sharply when a single table runs across many
+pages. The ``paginate`` filter splits the rows ahead of layout into
+page-sized groups, using row heights estimated from the text length,
+so the template emits one small table per page, each with its own
+header, page subtotal and amount carried from the previous pages::
+
+    {% for page in items | paginate('invoice') %}
+    <table class="{% if not page.last %}table-page{% endif %}">
+        ... {{ page.carried }} ... {% for item in page.rows %} ...
+        ... {{ page.subtotal }} ... {{ page.total }} ...
+    </table>
+    {% endfor %}
+
+Table geometry is declared in PAGINATED_TABLES. Estimates are
+deliberately conservative: a page that is fuller than estimated leaves
+blank space at its bottom, but never spills rows onto an extra page.
+"""
+
+import math
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+
+
+def paginate(
+    rows,
+    table: str,
+    carried=0,
+    continued: bool = False,
+) -> list[dict]:
+    """
+    Jinja2 filter: split table rows into pages with estimated heights.
+
+    Args:
+        rows: Row dictionaries
+        table: Key of PAGINATED_TABLES
+        carried: Amount carried into the first page (e.g. from a
+            previous render chunk)
+        continued: The first page has no document header, so it holds
+            as many rows as the following pages
+
+    Returns:
+        One dict per page: number, rows, carried (amount from previous
+        pages), subtotal, total (carried + subtotal), first and last;
+        empty if there are no rows
+    """
+    config = settings.PAGINATED_TABLES[table]
+    amount_key = config.get('amount_key')
+    capacity = config['page_mm'] if continued else config['first_page_mm']
+
+    pages: list[dict] = []
+    page_rows: list = []
+    used = 0.0
+    total = _amount(carried)
+
+    def close_page(last: bool) -> None:
+        nonlocal total
+        subtotal = _sum(page_rows, amount_key)
+        pages.append({
+            'number': len(pages) + 1,
+            'rows': page_rows,
+            'carried': total,
+            'subtotal': subtotal,
+            'total': total + subtotal,
+            'first': not pages,
+            'last': last,
+        })
+        total += subtotal
+
+    for row in rows or ():
+        height = estimate_row_height(row, config)
+        if page_rows and used + height > capacity:
+            close_page(last=False)
+            page_rows = []
+            used = 0.0
+            capacity = config['page_mm']
+
+        page_rows.append(row)
+        used += height
+
+    if page_rows:
+        close_page(last=True)
+
+    return pages
+
+
+def estimate_row_height(row: dict, config: dict) -> float:
+    """
+    Estimate the height of a table row in millimetres.
+
+    The wrapped column (``text_key``) is assumed to break every
+    ``chars_per_line`` characters; every other column fits on one line.
+    """
+    text = str(row.get(config['text_key']) or '')
+    lines = max(1, math.ceil(len(text) / config['chars_per_line']))
+    return config['row_padding_mm'] + lines * config['line_height_mm']
+
+
+def sum_amounts(rows, table: str) -> Decimal:
+    """Return the sum of the amount column of a paginated table."""
+    return _sum(rows, settings.PAGINATED_TABLES[table].get('amount_key'))
+
+
+def _sum(rows, amount_key: str | None) -> Decimal:
+    if not amount_key:
+        return Decimal(0)
+
+    return sum((_amount(row.get(amount_key)) for row in rows), Decimal(0))
+
+
+def _amount(value) -> Decimal:
+    try:
+        return Decimal(str(value)) if value not in (None, '') else Decimal(0)
+    except InvalidOperation:
+        return Decimal(0)
@@ -0,0 +1,278 @@
+"""
+WeasyPrint helpers for the documents application.
+
+Holds the WeasyPrint resources that do not depend on the job being
+rendered, so each worker process builds them once instead of once per
+document, and post-processes the PDFs written with them.
+"""
+
+import logging
+import mimetypes
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+import pikepdf
+from django.conf import settings
+from pypdf import PdfReader, PdfWriter
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+from weasyprint.urls import path2url
+
+from .canvas import load_layout
+from .docx_templates import get_docx_template
+from .rendering import (
+    get_environment,
+    resolve_renderer,
+    resolve_stylesheets,
+    resolve_template_file,
+)
+
+logger = logging.getLogger(__name__)
+
+_font_config: FontConfiguration | None = None
+
+# path -> (mtime_ns, parsed stylesheet)
+_stylesheets: dict[str, tuple[int, CSS]] = {}
+
+
+# ============================================================================
+# Resource fetching
+# ============================================================================
+
+class _AssetCache:
+    """
+    In-memory LRU of fetched assets, bounded by total size in bytes.
+
+    Entries are keyed by path and invalidated by modification time.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[int, bytes, str | None]] = OrderedDict()
+
+    def get(self, path: Path) -> tuple[bytes, str | None]:
+        stat = path.stat()
+        if stat.st_size > settings.PDF_ASSET_MAX_BYTES:
+            raise ValueError(f'Asset too large ({stat.st_size} bytes): {path.name}')
+
+        entry = self._entries.get(str(path))
+        if entry is not None and entry[0] == stat.st_mtime_ns:
+            self._entries.move_to_end(str(path))
+            return entry[1], entry[2]
+
+        data = path.read_bytes()
+        mime_type = mimetypes.guess_type(path.name)[0]
+        self._put(str(path), (stat.st_mtime_ns, data, mime_type))
+        return data, mime_type
+
+    def _put(self, key: str, entry: tuple[int, bytes, str | None]) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous[1])
+
+        self._entries[key] = entry
+        self.size += len(entry[1])
+
+        while self.size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted[1])
+
+
+_asset_cache: _AssetCache | None = None
+
+
+def get_base_url() -> str:
+    """Return the base URL relative resources are resolved against."""
+    return path2url(str(settings.DOCUMENT_ASSETS_DIR)).rstrip('/') + '/'
+
+
+def fetch_asset(url: str) -> dict:
+    """
+    WeasyPrint url_fetcher restricted to local assets.
+
+    Resolves ``data:`` URIs and files inside DOCUMENT_ASSETS_DIR or
+    IMAGE_CACHE_DIR (resized payload images), served from an in-memory
+    LRU. Any other URL (network, files elsewhere on
+    disk) is rejected immediately; WeasyPrint then skips the resource.
+
+    Args:
+        url: Absolute URL requested by WeasyPrint
+
+    Returns:
+        Fetcher result dictionary
+    """
+    global _asset_cache
+
+    if url.startswith('data:'):
+        return default_url_fetcher(url, allowed_protocols={'data'})
+
+    parts = urlsplit(url)
+    if parts.scheme != 'file' or parts.netloc not in ('', 'localhost'):
+        raise ValueError(f'Blocked resource URL: {url}')
+
+    allowed_dirs = (
+        Path(settings.DOCUMENT_ASSETS_DIR).resolve(),
+        Path(settings.IMAGE_CACHE_DIR).resolve(),
+    )
+    path = Path(url2pathname(parts.path)).resolve()
+    if not any(path.is_relative_to(directory) for directory in allowed_dirs) or not path.is_file():
+        raise ValueError(f'Resource outside the asset directory: {url}')
+
+    if _asset_cache is None:
+        _asset_cache = _AssetCache(settings.PDF_ASSET_CACHE_MAX_BYTES)
+
+    data, mime_type = _asset_cache.get(path)
+    return {'string': data, 'mime_type': mime_type, 'redirected_url': url}
+
+
+def get_font_config() -> FontConfiguration:
+    """
+    Return the process-wide WeasyPrint font configuration.
+
+    Building a FontConfiguration loads the fontconfig configuration and
+    scans the installed fonts, so it is created once and shared by every
+    stylesheet and document rendered in the process. Fonts declared with
+    @font-face in template stylesheets are registered on it once, when
+    the stylesheet is parsed.
+
+    Returns:
+        Shared FontConfiguration instance
+    """
+    global _font_config
+
+    if _font_config is None:
+        _font_config = FontConfiguration()
+        logger.info('WeasyPrint font configuration initialised')
+
+    return _font_config
+
+
+def get_stylesheets(template_name: str, batch: bool = False) -> list[CSS]:
+    """
+    Return the parsed stylesheets declared for a template.
+
+    Stylesheets are parsed on first use and reparsed only when the file
+    modification time changes.
+
+    Args:
+        template_name: Template identifier
+        batch: Also include the stylesheets for multi-record documents
+
+    Returns:
+        List of CSS objects to pass as ``stylesheets=`` to write_pdf()
+    """
+    return load_stylesheets(resolve_stylesheets(template_name, batch=batch))
+
+
+def load_stylesheets(paths: list[Path]) -> list[CSS]:
+    """
+    Return parsed stylesheets for the given files, using the process cache.
+
+    Args:
+        paths: Stylesheet files
+
+    Returns:
+        List of CSS objects, in the same order
+    """
+    stylesheets = []
+
+    for path in paths:
+        mtime = path.stat().st_mtime_ns
+        cached = _stylesheets.get(str(path))
+
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, CSS(
+                filename=str(path),
+                url_fetcher=fetch_asset,
+                font_config=get_font_config(),
+            ))
+            _stylesheets[str(path)] = cached
+            logger.info('Stylesheet parsed: %s', path.name)
+
+        stylesheets.append(cached[1])
+
+    return stylesheets
+
+
+def linearize_pdf(pdf_bytes: bytes) -> bytes:
+    """
+    Rewrite a large PDF as linearized ("fast web view").
+
+    A linearized PDF starts with the objects of its first page, so a
+    viewer fetching it with range requests can show page 1 before the
+    rest of the file arrives. PDFs smaller than PDF_LINEARIZE_MIN_BYTES
+    are returned unchanged.
+
+    Args:
+        pdf_bytes: PDF binary content
+
+    Returns:
+        PDF binary content
+    """
+    if not settings.PDF_LINEARIZE or len(pdf_bytes) < settings.PDF_LINEARIZE_MIN_BYTES:
+        return pdf_bytes
+
+    output = BytesIO()
+    with pikepdf.open(BytesIO(pdf_bytes)) as pdf:
+        pdf.save(output, linearize=True)
+
+    return output.getvalue()
+
+
+def append_incremental(base_pdf: bytes, new_pdf: bytes) -> bytes:
+    """
+    Append the pages of a PDF to another as an incremental update.
+
+    The base document is kept byte for byte and only the new pages, the
+    page tree and a new cross-reference section are written after it,
+    so the cost of the update depends on the appended pages. A
+    linearized base loses its fast web view: readers fall back to the
+    cross-reference chain.
+
+    Args:
+        base_pdf: PDF binary content to extend
+        new_pdf: PDF binary content whose pages are appended
+
+    Returns:
+        PDF binary content
+    """
+    writer = PdfWriter(BytesIO(base_pdf), incremental=True)
+    writer.append(PdfReader(BytesIO(new_pdf)))
+
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def warm_up() -> None:
+    """
+    Prepare the per-process rendering resources before the first job.
+
+    Builds the Jinja2 environment and font configuration, parses every
+    declared stylesheet (loading its @font-face fonts), loads the
+    layouts of canvas-rendered templates, preprocesses the DOCX templates
+    and lays out a throwaway document so fontconfig and Pango caches are
+    populated.
+    """
+    get_environment()
+    font_config = get_font_config()
+
+    stylesheets = []
+    for template_name in settings.DOCUMENT_STYLESHEETS:
+        stylesheets.extend(get_stylesheets(template_name))
+
+    for template_name in settings.SUPPORTED_DOCUMENT_TYPES:
+        if resolve_template_file(template_name).endswith('.docx'):
+            get_docx_template(settings.TEMPLATES_DOC_DIR / f'{template_name}.docx')
+        elif resolve_renderer(template_name) == 'canvas':
+            load_layout(template_name)
+
+    HTML(string='<p>warm-up</p>', url_fetcher=fetch_asset).write_pdf(
+        stylesheets=stylesheets,
+        font_config=font_config,
+    )
+    logger.info('PDF rendering warmed up (%d stylesheets)', len(stylesheets))
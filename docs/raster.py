@@ -0,0 +1,111 @@
+"""
+Raster exports of generated PDFs.
+
+WeasyPrint only writes PDF, so page images are rasterised from the
+stored PDF with pdfium. They are produced lazily, on the first request,
+and stored next to the job output file; later requests, and jobs sharing
+the same output through the render cache, reuse the stored image.
+"""
+
+import logging
+import posixpath
+from contextlib import contextmanager
+from io import BytesIO
+
+import pypdfium2 as pdfium
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+# format -> (Pillow format, content type)
+RASTER_FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'tiff': ('TIFF', 'image/tiff'),
+}
+
+# Errors reading the stored PDF or storing the image
+RASTER_ERRORS = (pdfium.PdfiumError, OSError)
+
+
+def get_thumbnail(job) -> str:
+    """
+    Return the storage name of the first-page thumbnail of a job.
+
+    Args:
+        job: Completed DocumentJob with a PDF output file
+
+    Returns:
+        Storage name of a PNG THUMBNAIL_WIDTH pixels wide
+    """
+    name = _derived_name(job, f'thumb{settings.THUMBNAIL_WIDTH}w.png')
+
+    if not default_storage.exists(name):
+        with _open_pdf(job) as pdf:
+            page = pdf[0]
+            image = page.render(scale=settings.THUMBNAIL_WIDTH / page.get_width()).to_pil()
+        _save_image(name, image, 'PNG')
+
+    return name
+
+
+def get_raster(job, page_number: int, dpi: int, output_format: str) -> str:
+    """
+    Return the storage name of one page of a job rendered as an image.
+
+    Args:
+        job: Completed DocumentJob with a PDF output file
+        page_number: 1-based page number
+        dpi: Resolution, at most RASTER_MAX_DPI
+        output_format: Key of RASTER_FORMATS
+
+    Returns:
+        Storage name of the image
+    """
+    if output_format not in RASTER_FORMATS:
+        raise ValueError(f'Unsupported raster format: {output_format}')
+    if not 0 < dpi <= settings.RASTER_MAX_DPI:
+        raise ValueError(f'DPI must be between 1 and {settings.RASTER_MAX_DPI}')
+
+    name = _derived_name(job, f'p{page_number}-{dpi}dpi.{output_format}')
+
+    if not default_storage.exists(name):
+        with _open_pdf(job) as pdf:
+            if not 0 < page_number <= len(pdf):
+                raise ValueError(f'Page {page_number} out of range (1-{len(pdf)})')
+            image = pdf[page_number - 1].render(scale=dpi / 72).to_pil()
+        _save_image(name, image, RASTER_FORMATS[output_format][0], dpi=dpi)
+
+    return name
+
+
+def _derived_name(job, suffix: str) -> str:
+    """Name an image after the output file it is rendered from."""
+    stem = posixpath.splitext(job.output_file.name)[0]
+    return f'{stem}.{suffix}'
+
+
+@contextmanager
+def _open_pdf(job):
+    """Open the output PDF of a job with pdfium."""
+    with job.output_file.open('rb') as output_file:
+        pdf = pdfium.PdfDocument(output_file.read())
+
+    try:
+        yield pdf
+    finally:
+        pdf.close()
+
+
+def _save_image(name: str, image, pillow_format: str, dpi: int | None = None) -> None:
+    buffer = BytesIO()
+    if dpi:
+        image.save(buffer, format=pillow_format, dpi=(dpi, dpi))
+    else:
+        image.save(buffer, format=pillow_format)
+
+    # Another request may have produced the same image meanwhile
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(buffer.getvalue()))
+        logger.info('Raster image stored: %s', name)
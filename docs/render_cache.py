@@ -0,0 +1,387 @@
+"""
+Content-addressed render cache for the documents application.
+
+Identical jobs (same template sources, same input data, same output
+format) produce the same artifact, so a job whose key is already known
+completes by pointing its output_file at the stored file instead of
+rendering again. Entries, in-flight locks and hit/miss counters live in
+Django's cache framework, shared by every worker when Redis is used.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from jinja2 import meta
+
+from .canvas import layout_path
+from .json_output import iter_json, resolve_json_options
+from .rendering import (
+    get_environment,
+    resolve_output_profile,
+    resolve_renderer,
+    resolve_stylesheets,
+    resolve_template_file,
+)
+
+logger = logging.getLogger(__name__)
+
+# (path, mtime_ns, size) -> (sha256 digest, referenced template names, reads the date)
+_file_fingerprints: dict[tuple[str, int, int], tuple[str, frozenset, bool]] = {}
+
+# assets dir -> (directory mtimes, monotonic time stamped, asset stamps)
+_asset_stamps: dict[str, tuple[tuple, float, dict[str, str]]] = {}
+
+# Context variables set to the render date (see rendering._with_utils)
+DATE_VARIABLES = frozenset({'now', 'today'})
+
+
+class RenderCache:
+    """
+    Cache of rendered artifacts keyed by template, input and format.
+
+    Responsibilities:
+    - Build deterministic cache keys
+    - Map keys to stored output files, with a TTL
+    - Coalesce concurrent identical renders with a short-lived lock
+    - Count hits and misses
+    """
+
+    # Bump to invalidate every entry after a change in rendering code
+    VERSION = 1
+
+    PREFIX = 'render-cache'
+
+    # =========================
+    # Keys
+    # =========================
+    @staticmethod
+    def build_key(template_name: str, input_data: dict, output_format: str) -> str:
+        """
+        Build the cache key for a render.
+
+        Args:
+            template_name: Template identifier
+            input_data: Template context
+            output_format: Output extension ('pdf', 'docx', 'json',
+                'json.gz'), or
+                'html' for rendered HTML
+
+        Returns:
+            Hex digest identifying the render
+        """
+        digest = hashlib.sha256()
+        for part in (
+            str(RenderCache.VERSION),
+            output_format,
+            template_name,
+            _template_fingerprint(template_name, output_format),
+        ):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+
+        # Canonical input, hashed in chunks so large payloads are never
+        # held as one string
+        for chunk in iter_json(input_data, sort_keys=True, default=str):
+            digest.update(chunk.encode('utf-8'))
+        digest.update(b'\0')
+
+        return digest.hexdigest()
+
+    # =========================
+    # Entries
+    # =========================
+    @staticmethod
+    def lookup(key: str) -> str | None:
+        """
+        Return the stored file name for a key, counting a hit or a miss.
+
+        Entries whose file no longer exists in storage are discarded.
+        """
+        file_name = cache.get(f'{RenderCache.PREFIX}:entry:{key}')
+
+        if file_name and not default_storage.exists(file_name):
+            cache.delete(f'{RenderCache.PREFIX}:entry:{key}')
+            file_name = None
+
+        RenderCache._incr('hits' if file_name else 'misses')
+        return file_name
+
+    @staticmethod
+    def store(key: str, file_name: str) -> None:
+        """Remember the stored file for a key for RENDER_CACHE_TTL seconds."""
+        cache.set(
+            f'{RenderCache.PREFIX}:entry:{key}',
+            file_name,
+            timeout=settings.RENDER_CACHE_TTL,
+        )
+
+    # =========================
+    # Rendered HTML handoff
+    # =========================
+    @staticmethod
+    def store_html(template_name: str, input_data: dict, html: str, part: str | None = None) -> None:
+        """
+        Keep the rendered HTML of a preview for RENDER_PREVIEW_TTL seconds.
+
+        A PDF job for the same template and payload started within that
+        time reuses it instead of rendering the template again. Composite
+        templates store the HTML of each dynamic part under its template
+        file (``part``).
+        """
+        cache.set(
+            RenderCache._html_key(template_name, input_data, part),
+            html,
+            timeout=settings.RENDER_PREVIEW_TTL,
+        )
+
+    @staticmethod
+    def lookup_html(template_name: str, input_data: dict, part: str | None = None) -> str | None:
+        """Return the HTML stored by store_html() for a render or part, if any."""
+        return cache.get(RenderCache._html_key(template_name, input_data, part))
+
+    @staticmethod
+    def _html_key(template_name: str, input_data: dict, part: str | None) -> str:
+        key = RenderCache.build_key(template_name, input_data, 'html')
+        return f'{RenderCache.PREFIX}:html:{key}' + (f':{part}' if part else '')
+
+    # =========================
+    # In-flight coalescing
+    # =========================
+    @staticmethod
+    def acquire(key: str, owner: str) -> bool:
+        """
+        Try to become the only job rendering a key.
+
+        The lock expires after RENDER_CACHE_LOCK_TIMEOUT seconds so a
+        crashed worker cannot block identical jobs forever.
+        """
+        return cache.add(
+            f'{RenderCache.PREFIX}:lock:{key}',
+            owner,
+            timeout=settings.RENDER_CACHE_LOCK_TIMEOUT,
+        )
+
+    @staticmethod
+    def release(key: str, owner: str) -> None:
+        """Release the lock for a key if it is still held by owner."""
+        lock_key = f'{RenderCache.PREFIX}:lock:{key}'
+        if cache.get(lock_key) == owner:
+            cache.delete(lock_key)
+
+    # =========================
+    # Counters
+    # =========================
+    @staticmethod
+    def stats() -> dict:
+        """Return hit/miss counters and the hit ratio."""
+        hits = cache.get(f'{RenderCache.PREFIX}:hits', 0)
+        misses = cache.get(f'{RenderCache.PREFIX}:misses', 0)
+        total = hits + misses
+
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+
+    @staticmethod
+    def reset_stats() -> None:
+        """Reset hit/miss counters."""
+        cache.delete_many([
+            f'{RenderCache.PREFIX}:hits',
+            f'{RenderCache.PREFIX}:misses',
+        ])
+
+    @staticmethod
+    def _incr(counter: str) -> None:
+        counter_key = f'{RenderCache.PREFIX}:{counter}'
+        cache.add(counter_key, 0, timeout=None)
+        try:
+            cache.incr(counter_key)
+        except ValueError:
+            # Evicted between add() and incr(); start over
+            cache.set(counter_key, 1, timeout=None)
+
+
+# ============================================================================
+# Template fingerprints
+# ============================================================================
+
+def _template_fingerprint(template_name: str, output_format: str) -> str:
+    """
+    Hash the sources a render depends on.
+
+    HTML templates include every template reachable through
+    extends/include/import (and layer or section templates, when layered
+    or composite) plus their stylesheets, the asset directory, the PDF
+    output profile and the renderer backend with its canvas layout, if
+    any; DOCX templates hash the .docx file and the asset directory,
+    whether the output is DOCX or PDF converted from it. Both include
+    the settings payload images are resized with. JSON output has no template file and
+    depends only on its output options.
+    """
+    if output_format.startswith('json'):
+        return json.dumps(resolve_json_options(template_name), sort_keys=True)
+
+    if output_format == 'docx' or resolve_template_file(template_name).endswith('.docx'):
+        template_path = settings.TEMPLATES_DOC_DIR / f'{template_name}.docx'
+        return digest_sources({
+            f'docx:{template_path.name}': file_fingerprint(template_path)[0],
+            'images': _image_settings(),
+            **fingerprint_assets(),
+        })
+
+    layers = settings.LAYERED_TEMPLATES.get(template_name, {})
+    roots = [resolve_template_file(template_name)]
+    roots.extend(layers[key] for key in ('background', 'overlay') if key in layers)
+    roots.extend(part['template'] for part in settings.COMPOSITE_TEMPLATES.get(template_name, []))
+    seen = fingerprint_templates(roots)
+
+    stylesheets = resolve_stylesheets(template_name)
+    stylesheets.extend(settings.TEMPLATES_DOC_DIR / path for path in layers.get('stylesheets', []))
+    for path in stylesheets:
+        seen[f'css:{path.name}'] = file_fingerprint(path)[0]
+
+    profile_name, profile_options = resolve_output_profile(template_name)
+    seen[f'profile:{profile_name}'] = json.dumps(profile_options, sort_keys=True)
+
+    renderer = resolve_renderer(template_name)
+    seen[f'renderer:{renderer}'] = settings.PDF_RENDERERS.get(renderer, '')
+    layout = layout_path(template_name)
+    if layout.is_file():
+        seen[f'layout:{layout.name}'] = file_fingerprint(layout)[0]
+
+    seen.update(fingerprint_assets())
+    seen['images'] = _image_settings()
+
+    return digest_sources(seen)
+
+
+def _image_settings() -> str:
+    """Settings payload images are resized and recompressed with."""
+    return json.dumps([
+        settings.IMAGE_RESIZE_DPI,
+        settings.IMAGE_JPEG_QUALITY,
+        settings.IMAGE_MAX_SIDE_PX,
+    ])
+
+
+def fingerprint_templates(template_names: list[str]) -> dict[str, str]:
+    """
+    Hash the given templates and every template they reach.
+
+    References through extends/include/import are followed; a dynamic
+    include depends on every template in the directory. Templates that
+    print ``now`` or ``today`` also depend on the render date, so their
+    renders are not reused on another day.
+
+    Args:
+        template_names: Template files to start from
+
+    Returns:
+        Template file -> sha256 digest of its source, plus 'date' -> the
+        current date when a template reads it
+    """
+    env = get_environment()
+    pending = list(template_names)
+    seen: dict[str, str] = {}
+
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+
+        _, filename, _ = env.loader.get_source(env, name)
+        digest, references, dated = file_fingerprint(Path(filename), parse=True)
+        seen[name] = digest
+        if dated:
+            seen['date'] = date.today().isoformat()
+
+        if None in references:
+            # Dynamic include: depend on every template in the directory
+            pending.extend(env.list_templates(extensions=['j2']))
+        pending.extend(ref for ref in references if ref is not None)
+
+    return seen
+
+
+def fingerprint_assets() -> dict[str, str]:
+    """
+    Stamp the files a document may reference in DOCUMENT_ASSETS_DIR, by size and mtime.
+
+    Stamps are memoised per process. Adding, removing or renaming a file
+    changes the mtime of its directory and restamps on the next call; a
+    file overwritten in place is picked up within RENDER_ASSET_STAMP_TTL
+    seconds.
+    """
+    assets_dir = Path(settings.DOCUMENT_ASSETS_DIR)
+    tree = _directory_mtimes(assets_dir)
+    memo = _asset_stamps.get(str(assets_dir))
+
+    if memo and memo[0] == tree and time.monotonic() - memo[1] < settings.RENDER_ASSET_STAMP_TTL:
+        return dict(memo[2])
+
+    stamps: dict[str, str] = {}
+    stamped_at = time.monotonic()
+    for path in assets_dir.rglob('*') if tree else ():
+        if path.is_file():
+            stat = path.stat()
+            stamps[f'asset:{path.relative_to(assets_dir)}'] = f'{stat.st_size}:{stat.st_mtime_ns}'
+
+    _asset_stamps[str(assets_dir)] = (tree, stamped_at, stamps)
+    return dict(stamps)
+
+
+def _directory_mtimes(root: Path) -> tuple:
+    """Return (path, mtime_ns) of root and every directory below it, or () if missing."""
+    if not root.is_dir():
+        return ()
+
+    mtimes = []
+    pending = [str(root)]
+    while pending:
+        path = pending.pop()
+        mtimes.append((path, os.stat(path).st_mtime_ns))
+        with os.scandir(path) as entries:
+            pending.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+
+    return tuple(sorted(mtimes))
+
+
+def digest_sources(sources: dict[str, str]) -> str:
+    """Hash named source digests in a stable order."""
+    return hashlib.sha256(
+        '\n'.join(f'{name}:{sources[name]}' for name in sorted(sources)).encode('utf-8')
+    ).hexdigest()
+
+
+def file_fingerprint(path: Path, parse: bool = False) -> tuple[str, frozenset, bool]:
+    """
+    Return the digest of a file and, for Jinja2 sources, its references
+    and whether it reads the render date.
+
+    Results are memoised per process and invalidated by mtime and size.
+    """
+    stat = os.stat(path)
+    memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+    if memo_key not in _file_fingerprints:
+        data = path.read_bytes()
+        references = frozenset()
+        dated = False
+        if parse:
+            env = get_environment()
+            ast = env.parse(data.decode('utf-8'))
+            references = frozenset(meta.find_referenced_templates(ast))
+            dated = not DATE_VARIABLES.isdisjoint(meta.find_undeclared_variables(ast))
+        _file_fingerprints[memo_key] = (hashlib.sha256(data).hexdigest(), references, dated)
+
+    return _file_fingerprints[memo_key]
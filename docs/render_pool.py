@@ -0,0 +1,270 @@
+"""
+Pool of long-lived render subprocesses.
+
+WeasyPrint and docxtpl leak and fragment memory over thousands of
+documents. Instead of rendering inside the Celery worker process, jobs
+hand the render call to a pre-warmed subprocess (docs.render_worker).
+A subprocess is replaced after RENDER_POOL_MAX_JOBS renders or once its
+RSS exceeds RENDER_POOL_MAX_RSS_MB, and a subprocess that crashes or
+hangs only fails the job it was rendering.
+"""
+
+import logging
+import os
+import pickle
+import select
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from .render_worker import HEADER
+
+logger = logging.getLogger(__name__)
+
+
+class RenderProcessError(Exception):
+    """The render subprocess died or stopped answering during a job."""
+
+
+class RenderProcess:
+    """A single render subprocess and its usage counters."""
+
+    def __init__(self) -> None:
+        self.jobs = 0
+        self.rss = 0
+        # True while a call has been sent and its response not fully read
+        self.in_call = False
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'docs.render_worker'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=str(settings.BASE_DIR),
+            env=os.environ.copy(),
+            bufsize=0,
+        )
+
+        ready = self._receive(settings.RENDER_POOL_START_TIMEOUT)
+        self.rss = ready['rss']
+        logger.info('Render process started (pid=%s)', self.process.pid)
+
+    def call(self, function: str, args: tuple, kwargs: dict, timeout: float):
+        """
+        Run a function in the subprocess and return its result.
+
+        Exceptions raised by the function are re-raised in the caller.
+        """
+        data = pickle.dumps(
+            {'function': function, 'args': args, 'kwargs': kwargs},
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+        self.in_call = True
+        try:
+            message = memoryview(HEADER.pack(len(data)) + data)
+            while message:
+                message = message[os.write(self.process.stdin.fileno(), message):]
+        except OSError as exc:
+            raise RenderProcessError(f'Render process {self.process.pid} is gone') from exc
+
+        response = self._receive(timeout)
+        self.in_call = False
+        self.jobs += 1
+        self.rss = response['rss']
+
+        if 'error' in response:
+            logger.debug('Render failed in subprocess:\n%s', response['traceback'])
+            raise response['error']
+
+        return response['result']
+
+    def is_exhausted(self) -> bool:
+        """Return True once the subprocess should be replaced."""
+        return (
+            self.jobs >= settings.RENDER_POOL_MAX_JOBS
+            or self.rss > settings.RENDER_POOL_MAX_RSS_MB * 1024 * 1024
+        )
+
+    def close(self) -> None:
+        """Stop the subprocess, killing it if it does not exit promptly."""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+    def _receive(self, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        header = self._read(HEADER.size, deadline)
+        (length,) = HEADER.unpack(header)
+        return pickle.loads(self._read(length, deadline))
+
+    def _read(self, size: int, deadline: float) -> bytes:
+        stdout = self.process.stdout
+        chunks = []
+
+        while size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([stdout], [], [], remaining)[0]:
+                self.process.kill()
+                raise RenderProcessError(
+                    f'Render process {self.process.pid} timed out'
+                )
+
+            chunk = os.read(stdout.fileno(), min(size, 1024 * 1024))
+            if not chunk:
+                exit_code = self.process.wait()
+                raise RenderProcessError(
+                    f'Render process {self.process.pid} exited with code {exit_code}'
+                )
+
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        return b''.join(chunks)
+
+
+class RenderPool:
+    """
+    Fixed-size pool of RenderProcess instances for one worker process.
+
+    Subprocesses are started lazily (or by start()) and reused across
+    jobs; one that fails, crashes or is exhausted is closed and replaced
+    on the next call.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._idle: list[RenderProcess] = []
+        self._busy = 0
+        # Subprocesses in the middle of a call
+        self._running: set[RenderProcess] = set()
+        self._condition = threading.Condition()
+
+    def start(self) -> None:
+        """Start every subprocess up front, so they are warm for the first job."""
+        with self._condition:
+            while len(self._idle) + self._busy < self.size:
+                self._idle.append(RenderProcess())
+
+    def run(self, function, *args, **kwargs):
+        """
+        Call a module-level function in a render subprocess.
+
+        Args:
+            function: Importable function (looked up by dotted path)
+            *args: Positional arguments, must be picklable
+            **kwargs: Keyword arguments, must be picklable
+
+        Returns:
+            The function result
+        """
+        path = f'{function.__module__}.{function.__qualname__}'
+        process = self._acquire()
+        with self._condition:
+            self._running.add(process)
+
+        try:
+            return process.call(path, args, kwargs, settings.RENDER_POOL_JOB_TIMEOUT)
+        finally:
+            with self._condition:
+                self._running.discard(process)
+            self._release(process)
+
+    def kill_running(self) -> None:
+        """
+        Kill the subprocesses in the middle of a call.
+
+        Their callers get RenderProcessError at once, and the subprocesses
+        are replaced on the next call.
+        """
+        with self._condition:
+            running = list(self._running)
+
+        for process in running:
+            process.process.kill()
+
+    def close(self) -> None:
+        """Stop the idle subprocesses."""
+        with self._condition:
+            while self._idle:
+                self._idle.pop().close()
+
+    def _acquire(self) -> RenderProcess:
+        with self._condition:
+            while not self._idle and self._busy >= self.size:
+                self._condition.wait()
+
+            self._busy += 1
+            if self._idle:
+                return self._idle.pop()
+
+        try:
+            return RenderProcess()
+        except BaseException:
+            with self._condition:
+                self._busy -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, process: RenderProcess) -> None:
+        # A process interrupted mid-call (crash, timeout, soft time limit)
+        # is in an unknown state; one whose render raised is still usable
+        if process.in_call or process.is_exhausted():
+            logger.info(
+                'Recycling render process (pid=%s, jobs=%d, rss=%.0f MB)',
+                process.process.pid,
+                process.jobs,
+                process.rss / (1024 * 1024),
+            )
+            process.close()
+            process = None
+
+        with self._condition:
+            self._busy -= 1
+            if process is not None:
+                self._idle.append(process)
+            self._condition.notify()
+
+
+_pool: RenderPool | None = None
+
+
+def get_pool() -> RenderPool:
+    """Return the render pool of this worker process, creating it on first use."""
+    global _pool
+
+    if _pool is None:
+        _pool = RenderPool(settings.RENDER_POOL_SIZE)
+
+    return _pool
+
+
+def run_rendering(function, *args, **kwargs):
+    """
+    Run a render function in the pool, or inline when the pool is disabled.
+
+    Args:
+        function: Module-level render function
+        *args: Positional arguments
+        **kwargs: Keyword arguments
+
+    Returns:
+        The function result
+    """
+    if not settings.RENDER_POOL_ENABLED:
+        return function(*args, **kwargs)
+
+    return get_pool().run(function, *args, **kwargs)
+
+
+def close_pool() -> None:
+    """Stop the render subprocesses of this worker process."""
+    global _pool
+
+    if _pool is not None:
+        _pool.close()
+        _pool = None
@@ -0,0 +1,111 @@
+"""
+Entry point of a render subprocess (``python -m docs.render_worker``).
+
+The process sets up Django, warms up the rendering resources and then
+serves render calls from its parent (see docs.render_pool) over
+stdin/stdout until stdin is closed. Each message is a pickled object
+prefixed with its length.
+"""
+
+import logging
+import os
+import pickle
+import resource
+import struct
+import sys
+import traceback
+
+# Every message is prefixed with its length as an unsigned 64-bit integer
+HEADER = struct.Struct('!Q')
+
+# Set in the environment of render subprocesses
+WORKER_ENV = 'DOCS_RENDER_WORKER'
+
+logger = logging.getLogger(__name__)
+
+
+def read_message(stream):
+    """Read one framed message from a binary stream, or None at EOF."""
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+
+    (length,) = HEADER.unpack(header)
+    return pickle.loads(stream.read(length))
+
+
+def write_message(stream, message) -> None:
+    """Write one framed message to a binary stream."""
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(HEADER.pack(len(data)))
+    stream.write(data)
+    stream.flush()
+
+
+def in_render_worker() -> bool:
+    """Return True inside a render subprocess."""
+    return os.environ.get(WORKER_ENV) == '1'
+
+
+def current_rss() -> int:
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # No procfs: fall back to the peak RSS (kilobytes on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main() -> None:
+    # Keep the protocol channel away from anything printed by libraries
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    requests = sys.stdin.buffer
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+    os.environ[WORKER_ENV] = '1'
+
+    import django
+
+    django.setup()
+
+    from django.utils.module_loading import import_string
+
+    from docs.pdf import warm_up
+
+    try:
+        warm_up()
+    except Exception:
+        logger.exception('PDF rendering warm-up failed')
+
+    write_message(channel, {'ready': True, 'rss': current_rss()})
+
+    while True:
+        request = read_message(requests)
+        if request is None:
+            break
+
+        try:
+            function = import_string(request['function'])
+            response = {'result': function(*request['args'], **request['kwargs'])}
+        except Exception as exc:
+            response = {
+                'error': _picklable(exc),
+                'traceback': traceback.format_exc(),
+            }
+
+        response['rss'] = current_rss()
+        write_message(channel, response)
+
+
+def _picklable(exc: Exception) -> Exception:
+    try:
+        pickle.loads(pickle.dumps(exc))
+        return exc
+    except Exception:
+        return RuntimeError(f'{type(exc).__name__}: {exc}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Template rendering helpers for the documents application.
+
+Provides a single Jinja2 environment per process, reused by every job
+the worker executes. Compiled templates are kept in memory and their
+bytecode is persisted to a directory shared by all worker processes on
+the node, so a template is only compiled once per change.
+"""
+
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from .codes import barcode, qr_code
+from .governor import join_limited
+from .images import image
+from .pagination import paginate
+
+logger = logging.getLogger(__name__)
+
+# Element id prefix marking where each record of a batch starts
+BATCH_ANCHOR_PREFIX = 'batch-record-'
+
+_BODY_RE = re.compile(r'<body[^>]*>(.*)</body>', re.DOTALL | re.IGNORECASE)
+
+_environment: Environment | None = None
+
+# path -> (mtime_ns, stylesheet text)
+_stylesheet_texts: dict[str, tuple[int, str]] = {}
+
+
+def get_environment() -> Environment:
+    """
+    Return the process-wide Jinja2 environment, building it on first use.
+
+    Templates are reloaded automatically when their modification time
+    changes, and the bytecode cache discards entries whose source
+    checksum no longer matches. The qr_code and barcode filters of
+    docs.codes, the image filter of docs.images and the paginate filter
+    of docs.pagination are registered.
+
+    Returns:
+        Shared Environment instance
+    """
+    global _environment
+
+    if _environment is None:
+        _environment = Environment(
+            loader=FileSystemLoader(str(settings.TEMPLATES_DOC_DIR)),
+            bytecode_cache=FileSystemBytecodeCache(
+                str(settings.JINJA_BYTECODE_CACHE_DIR),
+            ),
+            autoescape=True,
+            auto_reload=True,
+        )
+        _environment.filters.update(
+            qr_code=qr_code,
+            barcode=barcode,
+            image=image,
+            paginate=paginate,
+        )
+        logger.info(
+            'Jinja2 environment initialised (bytecode cache: %s)',
+            settings.JINJA_BYTECODE_CACHE_DIR,
+        )
+
+    return _environment
+
+
+def resolve_template_file(template_name: str) -> str:
+    """
+    Map a template identifier to its file name in TEMPLATES_DOC_DIR.
+
+    Args:
+        template_name: Template identifier (e.g. 'contract')
+
+    Returns:
+        Template file name (e.g. 'contract.html.j2'), or the identifier
+        itself when it is not declared in SUPPORTED_DOCUMENT_TYPES
+    """
+    entry = settings.SUPPORTED_DOCUMENT_TYPES.get(template_name, template_name)
+    return entry['file'] if isinstance(entry, dict) else entry
+
+
+def resolve_renderer(template_name: str) -> str:
+    """
+    Return the PDF renderer backend selected for a template.
+
+    Args:
+        template_name: Template identifier
+
+    Returns:
+        Key of PDF_RENDERERS: the 'renderer' of the template entry in
+        SUPPORTED_DOCUMENT_TYPES, or PDF_DEFAULT_RENDERER
+    """
+    entry = settings.SUPPORTED_DOCUMENT_TYPES.get(template_name)
+    if isinstance(entry, dict) and entry.get('renderer'):
+        return entry['renderer']
+
+    return settings.PDF_DEFAULT_RENDERER
+
+
+def resolve_stylesheets(template_name: str, batch: bool = False) -> list[Path]:
+    """
+    Return the stylesheet files declared for a template.
+
+    Args:
+        template_name: Template identifier
+        batch: Also include BATCH_STYLESHEETS, for multi-record documents
+
+    Returns:
+        Absolute paths listed in DOCUMENT_STYLESHEETS for the template
+    """
+    relative_paths = list(settings.DOCUMENT_STYLESHEETS.get(template_name, []))
+    if batch:
+        relative_paths.extend(settings.BATCH_STYLESHEETS)
+
+    return [
+        settings.TEMPLATES_DOC_DIR / relative_path
+        for relative_path in relative_paths
+    ]
+
+
+def resolve_output_profile(template_name: str) -> tuple[str, dict]:
+    """
+    Return the PDF output profile in effect for a template.
+
+    Args:
+        template_name: Template identifier
+
+    Returns:
+        Tuple of (profile name, WeasyPrint options from PDF_OUTPUT_PROFILES)
+    """
+    profile_name = settings.DOCUMENT_OUTPUT_PROFILES.get(
+        template_name,
+        settings.PDF_DEFAULT_OUTPUT_PROFILE,
+    )
+
+    return profile_name, dict(settings.PDF_OUTPUT_PROFILES[profile_name])
+
+
+def render_html(template_name: str, context: dict, max_chars: int | None = None) -> str:
+    """
+    Render an HTML template with the shared environment.
+
+    Args:
+        template_name: Template identifier
+        context: Context data for rendering
+        max_chars: Abort with RenderBudgetExceeded once the output grows
+            past this length
+
+    Returns:
+        Rendered HTML string
+    """
+    template = get_environment().get_template(
+        resolve_template_file(template_name),
+    )
+
+    if max_chars is None:
+        return template.render(**_with_utils(context))
+
+    return join_limited(template.generate(**_with_utils(context)), max_chars)
+
+
+def render_batch_html(template_name: str, records: list[dict]) -> str:
+    """
+    Render several records into a single HTML document.
+
+    The <head> of the first rendering is kept and the <body> content of
+    each record is wrapped in a section whose id starts with
+    BATCH_ANCHOR_PREFIX, so records can be located after layout.
+
+    Args:
+        template_name: Template identifier
+        records: One context dictionary per record
+
+    Returns:
+        Rendered HTML string
+    """
+    template = get_environment().get_template(
+        resolve_template_file(template_name),
+    )
+
+    head, tail = '', ''
+    sections = []
+
+    for index, record in enumerate(records):
+        html = template.render(**_with_utils(record))
+        match = _BODY_RE.search(html)
+
+        if match is None:
+            body = html
+        else:
+            body = match.group(1)
+            if index == 0:
+                head, tail = html[:match.start(1)], html[match.end(1):]
+
+        sections.append(
+            f'<section class="batch-record" id="{BATCH_ANCHOR_PREFIX}{index}">'
+            f'{body}</section>'
+        )
+
+    return head + ''.join(sections) + tail
+
+
+def inline_stylesheets(html: str, template_name: str) -> str:
+    """
+    Embed the stylesheets of a template in rendered HTML.
+
+    PDF rendering applies the stylesheets separately; HTML shown directly
+    in a browser needs them inline.
+
+    Args:
+        html: Rendered HTML
+        template_name: Template identifier
+
+    Returns:
+        HTML with a <style> block before </head>
+    """
+    css = []
+    for path in resolve_stylesheets(template_name):
+        mtime = path.stat().st_mtime_ns
+        cached = _stylesheet_texts.get(str(path))
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, path.read_text(encoding='utf-8'))
+            _stylesheet_texts[str(path)] = cached
+        css.append(cached[1])
+
+    style = '<style>' + '\n'.join(css) + '</style>'
+    if '</head>' in html:
+        return html.replace('</head>', f'{style}</head>', 1)
+
+    return style + html
+
+
+def _with_utils(context: dict) -> dict:
+    return {
+        **context,
+        'now': datetime.now(),
+        'today': datetime.today(),
+    }
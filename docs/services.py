@@ -3,21 +3,40 @@ Business services for the documents application.
 
 Provides high-level operations for document generation, including:
 - Job creation
+- Synchronous HTML preview
 - File storage
 - Task submission to Celery
 - Status retrieval
 """
 
 import logging
+from pathlib import Path
 
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files.base import ContentFile, File
 
+from .composite import is_composite, join_parts_html, render_parts_html
+from .docx_batch import get_progress
+from .governor import get_render_budget
 from .models import DocumentJob
+from .render_cache import RenderCache
+from .rendering import render_html, resolve_template_file
 
 logger = logging.getLogger(__name__)
 
 
+class SpooledFile(File):
+    """
+    File already on local disk.
+
+    FileSystemStorage moves files exposing temporary_file_path() instead
+    of copying them; other storages stream them in chunks.
+    """
+
+    def temporary_file_path(self) -> str:
+        return self.file.name
+
+
 class DocumentService:
     """
     Service layer for managing document generation jobs.
@@ -37,6 +56,7 @@ class DocumentService:
         template_name: str,
         input_data: dict,
         input_file=None,
+        output_format: str | None = None,
     ) -> DocumentJob:
         """
         Create a new document generation job.
@@ -46,6 +66,8 @@ class DocumentService:
                 ('contract', 'invoice', 'certificate')
             input_data: Dictionary containing template data
             input_file: Optional input JSON file
+            output_format: Optional output format different from the
+                template's ('pdf' for DOCX templates)
 
         Returns:
             The created DocumentJob instance
@@ -53,6 +75,7 @@ class DocumentService:
         job = DocumentJob.objects.create(
             template_name=template_name,
             input_data=input_data,
+            output_format=output_format,
             status=DocumentJob.Status.PENDING,
         )
 
@@ -68,6 +91,171 @@ class DocumentService:
 
         return job
 
+    @staticmethod
+    def create_batch_job(
+        template_name: str,
+        records: list[dict],
+        split: bool = False,
+        input_file=None,
+        bundle: str | None = None,
+    ) -> DocumentJob:
+        """
+        Create a batch job rendering several records into one output.
+
+        HTML templates produce one PDF; DOCX templates produce a zip of
+        documents or one merged document.
+
+        Args:
+            template_name: Template identifier
+            records: One context dictionary per record
+            split: Also store one PDF per record as child jobs (HTML only)
+            input_file: Optional input JSON file
+            bundle: 'zip' or 'merged' (DOCX only)
+
+        Returns:
+            The created DocumentJob instance
+        """
+        batch_input = {'records': records, 'split': split}
+        if bundle:
+            batch_input['bundle'] = bundle
+
+        job = DocumentJob.objects.create(
+            template_name=template_name,
+            job_type=DocumentJob.JobType.BATCH,
+            input_data=batch_input,
+            status=DocumentJob.Status.PENDING,
+        )
+
+        if input_file:
+            file_name = f'{job.id}_input.json'
+            job.input_file.save(file_name, input_file)
+
+        logger.info(
+            'Batch job created: %s (template=%s, records=%d)',
+            job.id,
+            template_name,
+            len(records),
+        )
+
+        return job
+
+    @staticmethod
+    def create_append_job(
+        parent: DocumentJob,
+        records: list[dict],
+        input_file=None,
+    ) -> DocumentJob:
+        """
+        Create a job appending new records to the PDF of an existing job.
+
+        The new pages are rendered with the parent's template and added
+        to a copy of the parent output as an incremental PDF update. DOCX
+        templates cannot be appended to, even when converted to PDF.
+
+        Args:
+            parent: Completed DocumentJob with a PDF output
+            records: One context dictionary per new record
+            input_file: Optional input JSON file
+
+        Returns:
+            The created DocumentJob instance
+        """
+        if not parent.is_completed() or not parent.output_file \
+                or not parent.output_file.name.endswith('.pdf'):
+            raise ValueError(f'Job {parent.id} has no PDF output to append to')
+
+        if resolve_template_file(parent.template_name).endswith('.docx'):
+            raise ValueError(f'Job {parent.id} uses a DOCX template, which cannot be appended to')
+
+        job = DocumentJob.objects.create(
+            template_name=parent.template_name,
+            job_type=DocumentJob.JobType.APPEND,
+            parent=parent,
+            input_data={'records': records},
+            status=DocumentJob.Status.PENDING,
+        )
+
+        if input_file:
+            file_name = f'{job.id}_input.json'
+            job.input_file.save(file_name, input_file)
+
+        logger.info(
+            'Append job created: %s (parent=%s, records=%d)',
+            job.id,
+            parent.id,
+            len(records),
+        )
+
+        return job
+
+    @staticmethod
+    def create_record_job(
+        parent: DocumentJob,
+        input_data: dict,
+        output_content: bytes,
+    ) -> DocumentJob:
+        """
+        Store one record of a split batch as a completed child job.
+
+        Args:
+            parent: Batch DocumentJob
+            input_data: Record context
+            output_content: PDF pages of the record
+
+        Returns:
+            The created DocumentJob instance
+        """
+        job = DocumentJob.objects.create(
+            template_name=parent.template_name,
+            input_data=input_data,
+            parent=parent,
+            status=DocumentJob.Status.RUNNING,
+        )
+
+        DocumentService.save_output_file(job, output_content, file_name=f'{job.id}.pdf')
+        job.mark_completed()
+
+        return job
+
+    # =========================
+    # Preview
+    # =========================
+    @staticmethod
+    def preview_html(template_name: str, input_data: dict) -> str:
+        """
+        Render the HTML of a document synchronously, without creating a job.
+
+        The result is kept in the render cache for a short time, so a PDF
+        job with the same payload skips the template rendering. Composite
+        templates show every part, each starting on a new page, and keep
+        the HTML of each dynamic part.
+
+        Args:
+            template_name: HTML template identifier
+            input_data: Dictionary containing template data
+
+        Returns:
+            Rendered HTML, without the template stylesheets
+        """
+        max_chars = get_render_budget(template_name)['max_html_chars']
+
+        if is_composite(template_name):
+            parts = render_parts_html(template_name, input_data, max_chars)
+
+            if settings.RENDER_CACHE_ENABLED:
+                for part, html in parts:
+                    if not part.get('static'):
+                        RenderCache.store_html(template_name, input_data, html, part=part['template'])
+
+            return join_parts_html([html for _, html in parts])
+
+        html = render_html(template_name, input_data, max_chars=max_chars)
+
+        if settings.RENDER_CACHE_ENABLED:
+            RenderCache.store_html(template_name, input_data, html)
+
+        return html
+
     # =========================
     # Celery integration
     # =========================
@@ -78,11 +266,13 @@ class DocumentService:
         This inspects SETTINGS.SUPPORTED_DOCUMENT_TYPES to find the actual
         template filename (e.g. 'contract.html.j2' or 'contract.docx') and
         chooses the appropriate task: docx -> generate_docx_task, json ->
-        generate_json_task, else -> generate_pdf_task.
+        generate_json_task, else -> generate_pdf_task. Batch jobs go to
+        generate_docx_batch_task or generate_pdf_batch_task, and append jobs
+        to generate_pdf_append_task.
         """
         template_file = None
         try:
-            template_file = job.template_name and settings.SUPPORTED_DOCUMENT_TYPES.get(job.template_name)
+            template_file = job.template_name and resolve_template_file(job.template_name)
         except Exception:
             template_file = None
 
@@ -90,9 +280,22 @@ class DocumentService:
         filename = template_file if template_file else job.template_name
         ext = (filename.split('.')[-1].lower() if filename and '.' in filename else '')
 
-        from docs.tasks import generate_docx_task, generate_json_task, generate_pdf_task
+        from docs.tasks import (
+            generate_docx_batch_task,
+            generate_docx_task,
+            generate_json_task,
+            generate_pdf_append_task,
+            generate_pdf_batch_task,
+            generate_pdf_task,
+        )
 
-        if ext == 'docx':
+        if job.is_batch() and ext == 'docx':
+            task = generate_docx_batch_task.apply_async((str(job.id),))  # type: ignore
+        elif job.is_batch():
+            task = generate_pdf_batch_task.apply_async((str(job.id),))  # type: ignore
+        elif job.is_append():
+            task = generate_pdf_append_task.apply_async((str(job.id),))  # type: ignore
+        elif ext == 'docx':
             task = generate_docx_task.apply_async((str(job.id),))  # type: ignore
         elif ext == 'json':
             task = generate_json_task.apply_async((str(job.id),))  # type: ignore
@@ -133,7 +336,17 @@ class DocumentService:
                 job.completed_at.isoformat() if job.completed_at else None
             ),
             'error_message': job.error_message,
+            'error_code': job.error_code,
             'output_url': job.output_file.url if job.output_file else None,
+            'job_type': job.job_type,
+            'output_profile': job.output_profile,
+            'output_format': job.output_format,
+            'progress': get_progress(str(job.id)) if job.is_batch() else None,
+            'parent_id': str(job.parent_id) if job.parent_id else None,
+            'children': (
+                [str(child_id) for child_id in job.children.values_list('id', flat=True)]
+                if job.is_batch() else []
+            ),
         }
 
     @staticmethod
@@ -158,7 +371,7 @@ class DocumentService:
     @staticmethod
     def save_output_file(
         job: DocumentJob,
-        output_content: bytes,
+        output_content: bytes | Path,
         file_name: str | None = None,
     ) -> None:
         """
@@ -166,16 +379,25 @@ class DocumentService:
 
         Args:
             job: DocumentJob instance
-            output_content: Binary content of the generated file
+            output_content: Binary content of the generated file, or the
+                path of a file written to RENDER_SPOOL_DIR, which is moved
+                (or streamed) into storage and then removed
             file_name: Optional filename (defaults to '<job_id>.pdf')
         """
         final_name = file_name or f'{job.id}.pdf'
 
-        job.output_file.save(
-            final_name,
-            ContentFile(output_content),
-            save=True,
-        )
+        if isinstance(output_content, Path):
+            try:
+                with output_content.open('rb') as spooled:
+                    job.output_file.save(final_name, SpooledFile(spooled), save=True)
+            finally:
+                output_content.unlink(missing_ok=True)
+        else:
+            job.output_file.save(
+                final_name,
+                ContentFile(output_content),
+                save=True,
+            )
 
         logger.info(
             'Output file saved: %s (job_id=%s)',
@@ -183,6 +405,27 @@ class DocumentService:
             job.id,
         )
 
+    @staticmethod
+    def link_output_file(job: DocumentJob, file_name: str) -> None:
+        """
+        Point the job output at an already stored file.
+
+        Used when an identical render is found in the render cache; the
+        file is shared between jobs, not copied.
+
+        Args:
+            job: DocumentJob instance
+            file_name: Storage name of the existing file
+        """
+        job.output_file.name = file_name
+        job.save(update_fields=['output_file', 'updated_at'])
+
+        logger.info(
+            'Output file reused: %s (job_id=%s)',
+            file_name,
+            job.id,
+        )
+
     # =========================
     # Query helpers
     # =========================
@@ -27,6 +27,7 @@ const i18n = {
             drag_drop_primary: "Arrastra tus archivos aquí",
             drag_drop_secondary: "o haz clic para seleccionar múltiples archivos",
             btn_submit: "✓ Generar Documentos",
+            btn_preview: "👁 Vista previa",
             btn_reset: "⟲ Limpiar",
 
             // File list
@@ -85,6 +86,7 @@ const i18n = {
             drag_drop_primary: "Drag your files here",
             drag_drop_secondary: "or click to select multiple files",
             btn_submit: "✓ Generate Documents",
+            btn_preview: "👁 Preview",
             btn_reset: "⟲ Clear",
 
             // File list
@@ -3,28 +3,105 @@ Celery tasks for the documents application.
 
 Defines asynchronous tasks for generating documents in multiple formats:
 - PDF
+- PDF batches (several records in one document)
+- PDF appends (new records added to an existing PDF)
 - DOCX
+- DOCX batches (a zip of documents or one merged document)
 - JSON
 """
 
-import json
 import logging
+import os
+import tempfile
 import traceback
-from io import BytesIO
+from pathlib import Path
 from typing import Any, NoReturn
 
 from celery import shared_task
+from celery.exceptions import Retry
+from celery.signals import worker_process_init, worker_process_shutdown
 from django.conf import settings
 from django.utils import timezone
-from docxtpl import DocxTemplate
-from jinja2 import Environment, FileSystemLoader, TemplateNotFound
+from django.utils.module_loading import import_string
+from jinja2 import TemplateNotFound
 from weasyprint import HTML
-
+from weasyprint.document import Document
+
+from .chunking import close_chunk_pool, is_chunked, render_chunked_pdf
+from .composite import is_composite, render_composite_pdf
+from .docx_batch import render_docx_batch, set_progress
+from .docx_templates import get_docx_template
+from .governor import (
+    RenderBudgetExceeded,
+    check_page_count,
+    enforce_budget,
+    get_batch_budget,
+    get_render_budget,
+    join_limited,
+)
+from .images import inline_images
+from .json_output import resolve_json_options, write_json
+from .layers import is_layered, render_layered_pdf
+from .office import close_office_pool, convert_to_pdf, get_office_pool
+from .pdf import (
+    append_incremental,
+    fetch_asset,
+    get_base_url,
+    get_font_config,
+    get_stylesheets,
+    linearize_pdf,
+    warm_up,
+)
+from .render_cache import RenderCache
+from .render_pool import close_pool, get_pool, run_rendering
+from .rendering import (
+    BATCH_ANCHOR_PREFIX,
+    render_batch_html,
+    render_html,
+    resolve_output_profile,
+    resolve_renderer,
+)
 from .services import DocumentService
 
 logger = logging.getLogger(__name__)
 
 
+# ============================================================================
+# Worker lifecycle
+# ============================================================================
+
+@worker_process_init.connect
+def _warm_up_worker_process(**kwargs) -> None:
+    """
+    Build shared rendering resources as soon as a worker process starts.
+
+    With the render pool enabled, rendering happens in subprocesses, so
+    those are started (and warm themselves up) instead.
+    """
+    try:
+        if settings.RENDER_POOL_ENABLED:
+            get_pool().start()
+        else:
+            warm_up()
+    except Exception:
+        # A failed warm-up only costs latency on the first job
+        logger.exception('PDF rendering warm-up failed')
+
+    if settings.OFFICE_POOL_PRESTART:
+        try:
+            get_office_pool().start()
+        except Exception:
+            logger.exception('Office process warm-up failed')
+
+
+@worker_process_shutdown.connect
+def _stop_render_pool(**kwargs) -> None:
+    """Stop the render subprocesses and office processes of an exiting worker process."""
+    close_pool()
+    close_chunk_pool()
+    close_office_pool()
+
+
 # ============================================================================
 # Base helpers
 # ============================================================================
@@ -46,6 +123,87 @@ def _handle_task_failure(self, job, exc: Exception) -> NoReturn:
     raise self.retry(exc=exc, countdown=60)
 
 
+def _handle_budget_exceeded(job, exc: RenderBudgetExceeded) -> dict[str, Any]:
+    logger.warning('Render budget exceeded for job %s: %s', job.id, exc)
+
+    # Not retried: the same input would exceed the budget again
+    job.mark_failed(error_message=str(exc), error_code=exc.code)
+
+    return {
+        'status': 'error',
+        'job_id': str(job.id),
+        'error_code': exc.code,
+        'message': str(exc),
+    }
+
+
+def _requeue(self, countdown: int) -> NoReturn:
+    """
+    Run the task again later without spending one of its retries.
+
+    self.retry() would count every wait against max_retries, leaving no
+    retry for a real failure after a few waits on the render lock.
+    """
+    request = self.request
+    self.apply_async(
+        args=request.args,
+        kwargs=request.kwargs,
+        task_id=request.id,
+        countdown=countdown,
+        retries=request.retries,
+    )
+    raise Retry(f'Re-queued in {countdown}s', when=countdown)
+
+
+def _generate_output(self, job, output_format: str, build_content, cacheable: bool = True) -> bool:
+    """
+    Store the job output, reusing an identical cached render if possible.
+
+    Concurrent jobs with the same cache key are coalesced: only the job
+    holding the key lock renders, the others are re-queued until the
+    artifact is available.
+
+    Args:
+        job: DocumentJob instance
+        output_format: Output extension ('pdf', 'docx', 'json', 'json.gz')
+        build_content: Callable returning the rendered bytes, or the
+            path of the rendered file in RENDER_SPOOL_DIR
+        cacheable: False if the output holds data of this job only, so
+            it is neither looked up in nor stored to the cache
+
+    Returns:
+        True if the output was served from the cache
+    """
+    file_name = f'{job.id}.{output_format}'
+
+    if not settings.RENDER_CACHE_ENABLED or not cacheable:
+        DocumentService.save_output_file(job, build_content(), file_name=file_name)
+        return False
+
+    cache_key = RenderCache.build_key(
+        job.template_name,
+        job.input_data or {},
+        output_format,
+    )
+    owner = str(job.id)
+
+    if not RenderCache.acquire(cache_key, owner):
+        logger.info('Identical render in progress, re-queuing (job_id=%s)', job.id)
+        _requeue(self, settings.RENDER_CACHE_COALESCE_COUNTDOWN)
+
+    try:
+        cached_file = RenderCache.lookup(cache_key)
+        if cached_file:
+            DocumentService.link_output_file(job, cached_file)
+            return True
+
+        DocumentService.save_output_file(job, build_content(), file_name=file_name)
+        RenderCache.store(cache_key, job.output_file.name)
+        return False
+    finally:
+        RenderCache.release(cache_key, owner)
+
+
 # ============================================================================
 # PDF task
 # ============================================================================
@@ -69,24 +227,227 @@ def generate_pdf_task(self, job_id: str) -> dict[str, Any]:
         job.mark_running()
         logger.info('Starting PDF generation (job_id=%s)', job_id)
 
-        html_content = _render_template(
+        options = _apply_output_profile(job)
+
+        cached = _generate_output(
+            self,
+            job,
+            'pdf',
+            lambda: _build_pdf(job.template_name, job.input_data or {}, options),
+        )
+
+        job.mark_completed()
+        logger.info('PDF generated successfully (job_id=%s, cached=%s)', job_id, cached)
+
+        return {'status': 'success', 'job_id': job_id, 'cached': cached}
+
+    except Retry:
+        raise
+    except RenderBudgetExceeded as exc:
+        return _handle_budget_exceeded(job, exc)
+    except Exception as exc:
+        _handle_task_failure(self, job, exc)
+
+
+# ============================================================================
+# Batch PDF task
+# ============================================================================
+
+@shared_task(bind=True, max_retries=3)
+def generate_pdf_batch_task(self, job_id: str) -> dict[str, Any]:
+    """
+    Generate one multi-page PDF from a list of records.
+
+    All records are rendered into a single HTML document and laid out by
+    WeasyPrint in one pass. With ``split`` enabled, the pages of each
+    record are also stored as a child job with its own PDF.
+
+    Args:
+        job_id: UUID of the batch DocumentJob
+
+    Returns:
+        Result metadata dictionary
+    """
+    job = _get_job_or_fail(job_id)
+    if not job:
+        return {'status': 'error', 'message': 'Job not found'}
+
+    try:
+        job.mark_running()
+        logger.info('Starting batch PDF generation (job_id=%s)', job_id)
+
+        batch_input = job.input_data or {}
+        records = batch_input.get('records') or []
+        if not records:
+            raise ValueError('Batch job has no records')
+
+        options = _apply_output_profile(job)
+
+        pdf_bytes, record_pdfs = run_rendering(
+            _render_batch_pdf,
             job.template_name,
-            job.input_data or {},
+            records,
+            options,
+            bool(batch_input.get('split')),
+        )
+
+        DocumentService.save_output_file(job, pdf_bytes, file_name=f'{job.id}.pdf')
+
+        if batch_input.get('split'):
+            # A retried job must not keep the children of a failed attempt
+            job.children.all().delete()
+
+            for record, record_pdf in zip(records, record_pdfs):
+                DocumentService.create_record_job(job, record, record_pdf)
+
+        job.mark_completed()
+        logger.info(
+            'Batch PDF generated successfully (job_id=%s, records=%d)',
+            job_id,
+            len(records),
         )
 
-        pdf_bytes = _html_to_pdf(html_content)
+        return {'status': 'success', 'job_id': job_id, 'records': len(records)}
+
+    except Retry:
+        raise
+    except RenderBudgetExceeded as exc:
+        return _handle_budget_exceeded(job, exc)
+    except Exception as exc:
+        _handle_task_failure(self, job, exc)
+
+
+# ============================================================================
+# Batch DOCX task
+# ============================================================================
+
+@shared_task(bind=True, max_retries=3)
+def generate_docx_batch_task(self, job_id: str) -> dict[str, Any]:
+    """
+    Generate the documents of a list of records from one DOCX template.
+
+    Every record is rendered from the same cached template in a single
+    render call, into a zip with one file per record or into one merged
+    document (``bundle``). Progress is reported while the batch runs.
+
+    Args:
+        job_id: UUID of the batch DocumentJob
+
+    Returns:
+        Result metadata dictionary
+    """
+    job = _get_job_or_fail(job_id)
+    if not job:
+        return {'status': 'error', 'message': 'Job not found'}
+
+    try:
+        job.mark_running()
+        logger.info('Starting batch DOCX generation (job_id=%s)', job_id)
+
+        batch_input = job.input_data or {}
+        records = batch_input.get('records') or []
+        if not records:
+            raise ValueError('Batch job has no records')
+
+        bundle = batch_input.get('bundle') or 'zip'
+        extension = 'zip' if bundle == 'zip' else 'docx'
+        template_path = settings.TEMPLATES_DOC_DIR / f'{job.template_name}.docx'
+        if not template_path.exists():
+            raise FileNotFoundError(f'DOCX template not found: {template_path}')
 
+        set_progress(job_id, 0, len(records))
         DocumentService.save_output_file(
             job,
-            pdf_bytes,
+            run_rendering(
+                _render_docx_batch,
+                job_id,
+                job.template_name,
+                str(template_path),
+                records,
+                bundle,
+            ),
+            file_name=f'{job.id}.{extension}',
+        )
+
+        job.mark_completed()
+        logger.info(
+            'Batch DOCX generated successfully (job_id=%s, records=%d, bundle=%s)',
+            job_id,
+            len(records),
+            bundle,
+        )
+
+        return {'status': 'success', 'job_id': job_id, 'records': len(records), 'bundle': bundle}
+
+    except Retry:
+        raise
+
+    except RenderBudgetExceeded as exc:
+        return _handle_budget_exceeded(job, exc)
+
+    except Exception as exc:
+        _handle_task_failure(self, job, exc)
+
+
+# ============================================================================
+# Append PDF task
+# ============================================================================
+
+@shared_task(bind=True, max_retries=3)
+def generate_pdf_append_task(self, job_id: str) -> dict[str, Any]:
+    """
+    Append new records to the PDF of the parent job.
+
+    Only the new records are rendered; their pages are added to a copy
+    of the parent output as an incremental update, so the cost depends
+    on the new records and not on the size of the existing document.
+
+    Args:
+        job_id: UUID of the append DocumentJob
+
+    Returns:
+        Result metadata dictionary
+    """
+    job = _get_job_or_fail(job_id)
+    if not job:
+        return {'status': 'error', 'message': 'Job not found'}
+
+    try:
+        job.mark_running()
+        logger.info('Starting PDF append (job_id=%s, parent=%s)', job_id, job.parent_id)
+
+        records = (job.input_data or {}).get('records') or []
+        if not records:
+            raise ValueError('Append job has no records')
+
+        options = _apply_output_profile(job)
+
+        new_pdf = run_rendering(_render_records_pdf, job.template_name, records, options)
+
+        with job.parent.output_file.open('rb') as parent_file:
+            base_pdf = parent_file.read()
+
+        DocumentService.save_output_file(
+            job,
+            append_incremental(base_pdf, new_pdf),
             file_name=f'{job.id}.pdf',
         )
 
         job.mark_completed()
-        logger.info('PDF generated successfully (job_id=%s)', job_id)
+        logger.info(
+            'PDF appended successfully (job_id=%s, records=%d, base=%d bytes, added=%d bytes)',
+            job_id,
+            len(records),
+            len(base_pdf),
+            job.output_file.size - len(base_pdf),
+        )
 
-        return {'status': 'success', 'job_id': job_id}
+        return {'status': 'success', 'job_id': job_id, 'records': len(records)}
 
+    except Retry:
+        raise
+    except RenderBudgetExceeded as exc:
+        return _handle_budget_exceeded(job, exc)
     except Exception as exc:
         _handle_task_failure(self, job, exc)
 
@@ -109,26 +470,31 @@ def generate_docx_task(self, job_id: str) -> dict[str, Any]:
         if not template_path.exists():
             raise FileNotFoundError(f'DOCX template not found: {template_path}')
 
-        doc = DocxTemplate(str(template_path))
-        doc.render(job.input_data or {}, autoescape=True)
+        # Optional DOCX -> PDF stage, by the office pool of this worker process
+        output_format = 'pdf' if job.converts_to_pdf() else 'docx'
 
-        # Guardamos directamente en memoria
-        buffer = BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-        docx_bytes = buffer.read()
-        buffer.close() 
-        DocumentService.save_output_file(
-            job,
-            docx_bytes,
-            file_name=f'{job.id}.docx'
-        )
+        def build_docx() -> Path:
+            output_path = run_rendering(
+                _render_docx,
+                job.template_name,
+                str(template_path),
+                job.input_data or {},
+            )
+            if output_format == 'pdf':
+                output_path = convert_to_pdf(output_path)
+            return output_path
+
+        cached = _generate_output(self, job, output_format, build_docx)
 
         job.mark_completed()
-        logger.info('DOCX generated successfully (job_id=%s)', job_id)
+        logger.info('DOCX generated successfully (job_id=%s, cached=%s)', job_id, cached)
 
-        return {'status': 'success', 'job_id': job_id}
+        return {'status': 'success', 'job_id': job_id, 'cached': cached}
 
+    except Retry:
+        raise
+    except RenderBudgetExceeded as exc:
+        return _handle_budget_exceeded(job, exc)
     except Exception as exc:
         _handle_task_failure(self, job, exc)
 
@@ -156,31 +522,42 @@ def generate_json_task(self, job_id: str) -> dict[str, Any]:
         logger.info('Starting JSON generation (job_id=%s)', job_id)
 
         input_data = job.input_data or {}
-
-        output_data = {
-            'template': job.template_name,
-            'generated_at': timezone.now().isoformat(),
-            'input_data': input_data,
-            'summary': _process_data(input_data),
-        }
-
-        json_bytes = json.dumps(
-            output_data,
-            indent=2,
-            ensure_ascii=False,
-        ).encode('utf-8')
-
-        DocumentService.save_output_file(
+        options = resolve_json_options(job.template_name)
+
+        def build_json() -> Path:
+            output_data = {
+                'template': job.template_name,
+                'generated_at': timezone.now().isoformat(),
+            }
+            if options['reference_input']:
+                output_data['input_ref'] = {
+                    'job_id': str(job.id),
+                    'input_file': job.input_file.name or None,
+                }
+            else:
+                output_data['input_data'] = input_data
+            output_data['summary'] = _process_data(input_data)
+
+            return write_json(output_data, options)
+
+        output_format = 'json.gz' if options['gzip'] else 'json'
+        # A reference points at the input of this job, which an identical
+        # payload of another job must not reuse
+        cached = _generate_output(
+            self,
             job,
-            json_bytes,
-            file_name=f'{job.id}.json',
+            output_format,
+            build_json,
+            cacheable=not options['reference_input'],
         )
 
         job.mark_completed()
-        logger.info('JSON generated successfully (job_id=%s)', job_id)
+        logger.info('JSON generated successfully (job_id=%s, cached=%s)', job_id, cached)
 
-        return {'status': 'success', 'job_id': job_id}
+        return {'status': 'success', 'job_id': job_id, 'cached': cached}
 
+    except Retry:
+        raise
     except Exception as exc:
         _handle_task_failure(self, job, exc)
 
@@ -189,53 +566,331 @@ def generate_json_task(self, job_id: str) -> dict[str, Any]:
 # Template & conversion helpers
 # ============================================================================
 
-def _render_template(template_name: str, context: dict) -> str:
+def _render_template(
+    template_name: str,
+    context: dict,
+    max_chars: int | None = None,
+    part: str | None = None,
+) -> str:
     """
-    Render a template.
+    Render a template, reusing the HTML of a recent preview if possible.
 
     Args:
         template_name: Template base name (without extension)
         context: Context data for rendering
+        max_chars: Maximum rendered HTML size
+        part: Template file of a composite part, rendered instead of the
+            template file
 
     Returns:
         Rendered HTML string
     """
-    from datetime import datetime
+    if settings.RENDER_CACHE_ENABLED:
+        html_content = RenderCache.lookup_html(template_name, context, part)
+        if html_content is not None:
+            logger.info('Template HTML reused from preview: %s', part or template_name)
+            return join_limited([html_content], max_chars)
+
+    try:
+        html_content = render_html(part or template_name, context, max_chars=max_chars)
+        logger.info('Template rendered: %s', part or template_name)
+        return html_content
+    except TemplateNotFound:
+        logger.error('Template not found: %s', part or template_name)
+        raise
+
+
+def _build_pdf(template_name: str, context: dict, options: dict) -> bytes:
+    """
+    Render a PDF in the render pool.
+
+    Chunked documents are dispatched from this process instead: it owns
+    the chunk pool their chunks are laid out in, under the template
+    budget.
+
+    Args:
+        template_name: Template identifier
+        context: Context data for rendering
+        options: WeasyPrint options of the output profile
+
+    Returns:
+        PDF binary content
+    """
+    if settings.RENDER_POOL_ENABLED and is_chunked(template_name, context):
+        budget = get_render_budget(template_name)
+        # The memory limit is enforced in the chunk subprocesses, where
+        # the layout happens, not against this process
+        with enforce_budget({**budget, 'max_memory_mb': None}):
+            pdf_bytes = render_chunked_pdf(template_name, context, options, budget)
+
+        return linearize_pdf(pdf_bytes)
+
+    return run_rendering(_render_pdf, template_name, context, options)
+
+
+def _render_pdf(template_name: str, context: dict, options: dict | None = None) -> bytes:
+    """
+    Render a template to PDF with the renderer backend it selects.
+
+    Every backend runs under the render budget of the template, and
+    large results are linearized.
+
+    Args:
+        template_name: Template identifier
+        context: Context data for rendering
+        options: WeasyPrint options of the output profile
+
+    Returns:
+        PDF binary content
+    """
+    budget = get_render_budget(template_name)
+    renderer = import_string(settings.PDF_RENDERERS[resolve_renderer(template_name)])
+
+    with enforce_budget(budget):
+        pdf_bytes = renderer(template_name, context, options or {}, budget)
+
+    return linearize_pdf(pdf_bytes)
+
 
-    env = Environment(
-        loader=FileSystemLoader(str(settings.TEMPLATES_DOC_DIR)),
-        autoescape=True,
+def _render_weasyprint_pdf(
+    template_name: str,
+    context: dict,
+    options: dict,
+    budget: dict,
+) -> bytes:
+    """
+    Render an HTML template with WeasyPrint, using the composite, layered
+    or chunked path when declared.
+
+    Args:
+        template_name: Template identifier
+        context: Context data for rendering
+        options: WeasyPrint options of the output profile
+        budget: Render budget of the template
+
+    Returns:
+        PDF binary content
+    """
+    if is_composite(template_name):
+        return render_composite_pdf(
+            template_name,
+            context,
+            options,
+            budget,
+            render_part=lambda part, part_context, max_chars: _render_template(
+                template_name,
+                part_context,
+                max_chars=max_chars,
+                part=part,
+            ),
+        )
+
+    if is_layered(template_name):
+        return render_layered_pdf(template_name, context, options, budget)
+
+    if is_chunked(template_name, context):
+        # Only reached in-process; render subprocesses lay out the chunks
+        # one after another (see _build_pdf)
+        return render_chunked_pdf(template_name, context, options, budget)
+
+    return _html_to_pdf(
+        _render_template(template_name, context, max_chars=budget['max_html_chars']),
+        template_name=template_name,
+        options=options,
+        max_pages=budget['max_pages'],
     )
 
-    context_with_utils = {
-        **context,
-        'now': datetime.now(),
-        'today': datetime.today(),
-    }
 
-    template_file = f'{template_name}'
+def _render_records_pdf(template_name: str, records: list[dict], options: dict) -> bytes:
+    """
+    Render a list of records into one PDF within the batch budget.
 
-    try:
-        template = env.get_template(template_file)
-        logger.info('Template loaded: %s', template_file)
-        return template.render(**context_with_utils)
-    except TemplateNotFound:
-        logger.error('Template not found: %s', template_file)
-        raise
+    Args:
+        template_name: Template identifier
+        records: One context dictionary per record
+        options: WeasyPrint options of the output profile
+
+    Returns:
+        PDF binary content
+    """
+    budget = get_batch_budget(template_name, len(records))
+
+    with enforce_budget(budget):
+        return _layout_records(template_name, records, options, budget).write_pdf(**options)
+
+
+def _render_batch_pdf(
+    template_name: str,
+    records: list[dict],
+    options: dict,
+    split: bool = False,
+) -> tuple[bytes, list[bytes]]:
+    """
+    Render a batch job within the batch budget, optionally split per record.
+
+    Args:
+        template_name: Template identifier
+        records: One context dictionary per record
+        options: WeasyPrint options of the output profile
+        split: Also return the pages of each record as its own PDF
+
+    Returns:
+        Linearized PDF of the batch, and one PDF per record when split
+    """
+    budget = get_batch_budget(template_name, len(records))
+
+    with enforce_budget(budget):
+        document = _layout_records(template_name, records, options, budget)
+        pdf_bytes = document.write_pdf(**options)
+        record_pdfs = _split_batch_document(document, len(records), options) if split else []
+
+    return linearize_pdf(pdf_bytes), record_pdfs
+
+
+def _layout_records(template_name: str, records: list[dict], options: dict, budget: dict) -> Document:
+    """Lay out a list of records as one document, within the size limits of a budget."""
+    document = _layout_html(
+        join_limited([render_batch_html(template_name, records)], budget['max_html_chars']),
+        template_name=template_name,
+        batch=True,
+        options=options,
+    )
+    check_page_count(len(document.pages), budget['max_pages'])
+
+    return document
+
+
+def _apply_output_profile(job) -> dict:
+    """
+    Record the output profile of the job template on the job.
+
+    Args:
+        job: DocumentJob instance
+
+    Returns:
+        WeasyPrint options of the profile, for render() and write_pdf()
+    """
+    profile_name, options = resolve_output_profile(job.template_name)
+
+    job.output_profile = profile_name
+    job.save(update_fields=['output_profile', 'updated_at'])
+
+    return options
+
+
+def _render_docx(template_name: str, template_path: str, context: dict) -> Path:
+    """
+    Render a DOCX template within the time and memory limits of its budget.
+
+    The document is written straight to a file in RENDER_SPOOL_DIR, so
+    it is never held in memory or sent back through the render pool.
+
+    Args:
+        template_name: Template identifier
+        template_path: Path of the .docx template
+        context: Context data for rendering
+
+    Returns:
+        Path of the rendered file, to be handed to save_output_file()
+    """
+    with enforce_budget(get_render_budget(template_name)):
+        doc = get_docx_template(template_path)
+        doc.render(inline_images(doc, context), autoescape=True)
+
+        descriptor, spool_path = tempfile.mkstemp(suffix='.docx', dir=settings.RENDER_SPOOL_DIR)
+        try:
+            with os.fdopen(descriptor, 'wb') as output:
+                doc.save(output)
+        except BaseException:
+            os.remove(spool_path)
+            raise
+
+        return Path(spool_path)
+
+
+def _render_docx_batch(
+    job_id: str,
+    template_name: str,
+    template_path: str,
+    records: list[dict],
+    bundle: str,
+) -> Path:
+    """
+    Render a DOCX batch within the time and memory limits of the batch budget.
+
+    Args:
+        job_id: UUID of the batch job, to report progress under
+        template_name: Template identifier
+        template_path: Path of the .docx template
+        records: One context dictionary per record
+        bundle: 'zip' (one file per record) or 'merged' (one document)
+
+    Returns:
+        Path of the bundle in RENDER_SPOOL_DIR, to be handed to
+        save_output_file()
+    """
+    with enforce_budget(get_batch_budget(template_name, len(records))):
+        return render_docx_batch(job_id, template_name, template_path, records, bundle)
+
+
+def _layout_html(
+    html_content: str,
+    template_name: str | None = None,
+    batch: bool = False,
+    options: dict | None = None,
+) -> Document:
+    """
+    Lay out HTML content into a paginated WeasyPrint document.
 
+    Image options (optimize_images, jpeg_quality, dpi) take effect when
+    images are loaded during layout, so the output profile is passed
+    here as well as to write_pdf().
 
-def _html_to_pdf(html_content: str) -> bytes:
+    Args:
+        html_content: Rendered HTML
+        template_name: Template identifier, used to apply its stylesheets
+        batch: Apply the multi-record stylesheets as well
+        options: WeasyPrint options of the output profile
+
+    Returns:
+        WeasyPrint Document
+    """
+    html = HTML(
+        string=html_content,
+        base_url=get_base_url(),
+        url_fetcher=fetch_asset,
+    )
+
+    return html.render(
+        stylesheets=get_stylesheets(template_name, batch=batch) if template_name else None,
+        font_config=get_font_config(),
+        **(options or {}),
+    )
+
+
+def _html_to_pdf(
+    html_content: str,
+    template_name: str | None = None,
+    options: dict | None = None,
+    max_pages: int | None = None,
+) -> bytes:
     """
     Convert HTML content to PDF using WeasyPrint.
 
     Args:
         html_content: Rendered HTML
+        template_name: Template identifier, used to apply its stylesheets
+        options: WeasyPrint options of the output profile
+        max_pages: Fail before writing the PDF if the layout has more pages
 
     Returns:
         PDF binary content
     """
-    html = HTML(string=html_content, base_url='/')
-    pdf_bytes = html.write_pdf()
+    options = options or {}
+    document = _layout_html(html_content, template_name, options=options)
+    check_page_count(len(document.pages), max_pages)
+
+    pdf_bytes = document.write_pdf(**options)
 
     if not pdf_bytes:
         raise ValueError('Failed to generate PDF')
@@ -244,6 +899,46 @@ def _html_to_pdf(html_content: str) -> bytes:
     return pdf_bytes
 
 
+def _split_batch_document(
+    document: Document,
+    record_count: int,
+    options: dict | None = None,
+) -> list[bytes]:
+    """
+    Split a laid out batch document into one PDF per record.
+
+    Record boundaries are found through the BATCH_ANCHOR_PREFIX anchors
+    emitted by render_batch_html; pages are reused, not laid out again.
+
+    Args:
+        document: Laid out batch document
+        record_count: Number of records in the batch
+        options: WeasyPrint options of the output profile
+
+    Returns:
+        PDF binary content for each record, in order
+    """
+    first_pages: dict[int, int] = {}
+
+    for page_number, page in enumerate(document.pages):
+        for anchor in page.anchors:
+            if anchor.startswith(BATCH_ANCHOR_PREFIX):
+                first_pages.setdefault(int(anchor[len(BATCH_ANCHOR_PREFIX):]), page_number)
+
+    if len(first_pages) != record_count:
+        raise ValueError(
+            f'Found {len(first_pages)} of {record_count} records in the batch document'
+        )
+
+    boundaries = [first_pages[index] for index in range(record_count)]
+    boundaries.append(len(document.pages))
+
+    return [
+        document.copy(document.pages[start:end]).write_pdf(**(options or {}))
+        for start, end in zip(boundaries, boundaries[1:])
+    ]
+
+
 def _process_data(data: dict) -> dict:
     """
     Generate a summary from input data.
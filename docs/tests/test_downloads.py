@@ -0,0 +1,102 @@
+"""
+End-to-end tests of linearized PDF outputs and Range downloads.
+
+A contract is generated by the PDF task (in-process, with every output
+linearized) and downloaded through DownloadView with the Django test
+client.
+"""
+
+import json
+from io import BytesIO
+
+import pikepdf
+import pytest
+from django.urls import reverse
+
+from docs.models import DocumentJob
+from docs.services import DocumentService
+from docs.tasks import generate_pdf_task
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def render_settings(settings, tmp_path):
+    """Render in-process, without the render cache, linearizing every PDF."""
+    settings.MEDIA_ROOT = tmp_path
+    settings.RENDER_SPOOL_DIR = tmp_path
+    settings.RENDER_POOL_ENABLED = False
+    settings.RENDER_CACHE_ENABLED = False
+    settings.PDF_LINEARIZE = True
+    settings.PDF_LINEARIZE_MIN_BYTES = 0
+    return settings
+
+
+@pytest.fixture
+def contract_job(render_settings):
+    """A completed contract job with its stored PDF."""
+    input_data = json.loads((render_settings.BASE_DIR / 'example_contract.json').read_text(encoding='utf-8'))
+    job = DocumentService.create_job('contract', input_data)
+
+    result = generate_pdf_task.apply(args=[str(job.id)]).get()
+    assert result['status'] == 'success'
+
+    job.refresh_from_db()
+    assert job.status == DocumentJob.Status.COMPLETED
+    return job
+
+
+def _download(client, job, range_header=None):
+    headers = {'Range': range_header} if range_header else {}
+    return client.get(reverse('documentos:download', args=[job.id]), headers=headers)
+
+
+def _stored_bytes(job):
+    with job.output_file.open('rb') as output_file:
+        return output_file.read()
+
+
+def test_stored_output_is_linearized(contract_job):
+    with pikepdf.open(BytesIO(_stored_bytes(contract_job))) as pdf:
+        assert pdf.is_linearized
+
+
+def test_range_returns_partial_content(client, contract_job):
+    data = _stored_bytes(contract_job)
+
+    response = _download(client, contract_job, 'bytes=0-1023')
+
+    assert response.status_code == 206
+    assert response['Content-Range'] == f'bytes 0-1023/{len(data)}'
+    assert response['Content-Length'] == '1024'
+    assert b''.join(response.streaming_content) == data[:1024]
+
+
+def test_suffix_range_returns_the_end_of_the_file(client, contract_job):
+    data = _stored_bytes(contract_job)
+
+    response = _download(client, contract_job, 'bytes=-100')
+
+    assert response.status_code == 206
+    assert response['Content-Range'] == f'bytes {len(data) - 100}-{len(data) - 1}/{len(data)}'
+    assert b''.join(response.streaming_content) == data[-100:]
+
+
+def test_unsatisfiable_range_returns_416(client, contract_job):
+    size = len(_stored_bytes(contract_job))
+
+    response = _download(client, contract_job, f'bytes={size}-')
+
+    assert response.status_code == 416
+    assert response['Content-Range'] == f'bytes */{size}'
+
+
+@pytest.mark.parametrize('range_header', ['bytes=500-100', 'bytes=abc', 'items=0-10'])
+def test_malformed_range_returns_the_whole_file(client, contract_job, range_header):
+    data = _stored_bytes(contract_job)
+
+    response = _download(client, contract_job, range_header)
+
+    assert response.status_code == 200
+    assert response['Accept-Ranges'] == 'bytes'
+    assert b''.join(response.streaming_content) == data
@@ -16,12 +16,25 @@ urlpatterns = [
     # Upload of documents
     path('upload/', csrf_exempt(views.UploadView.as_view()), name='upload'),
     
+    # Upload of a batch of records rendered into one PDF
+    path('batch/', csrf_exempt(views.BatchUploadView.as_view()), name='batch_upload'),
+    
+    # Append records to the PDF of a completed job
+    path('append/<uuid:job_id>/', csrf_exempt(views.AppendView.as_view()), name='append'),
+    
+    # Synchronous HTML preview, no job created
+    path('preview/', csrf_exempt(views.PreviewView.as_view()), name='preview'),
+    
     # Status check of document job
     path('status/<uuid:job_id>/', views.StatusView.as_view(), name='status'),
     
     # Download generated document
     path('download/<uuid:job_id>/', views.DownloadView.as_view(), name='download'),
     
+    # First-page thumbnail and page images of a generated PDF
+    path('thumbnail/<uuid:job_id>/', views.ThumbnailView.as_view(), name='thumbnail'),
+    path('raster/<uuid:job_id>/', views.RasterView.as_view(), name='raster'),
+    
     # Delete document job
     path('delete/<uuid:job_id>/', csrf_exempt(views.DeleteJobView.as_view()), name='delete'),
     
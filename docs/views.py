@@ -3,26 +3,46 @@ Views for the documents application.
 
 Defines views for:
 - File upload (UploadView)
+- Batch upload (BatchUploadView)
+- Incremental append to a generated PDF (AppendView)
+- Synchronous HTML preview (PreviewView)
 - Status checking (StatusView)
 - Document download (DownloadView)
+- Page thumbnails and raster exports (ThumbnailView, RasterView)
 """
 
 import json
 import logging
+import re
 
 from django.conf import settings
-from django.http import FileResponse, JsonResponse
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
+from .docx_batch import BUNDLES
+from .governor import RenderBudgetExceeded
 from .models import DocumentJob
+from .raster import RASTER_ERRORS, RASTER_FORMATS, get_raster, get_thumbnail
+from .rendering import inline_stylesheets, resolve_template_file
 from .services import DocumentService
 
 logger = logging.getLogger(__name__)
 
+# Single byte range: "bytes=start-end", "bytes=start-" or "bytes=-suffix"
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
 
 
 
@@ -53,6 +73,7 @@ class UploadView(View):
             - template_name: Template type
             - file: JSON file (optional)
             - data: JSON directly in the body (if no file)
+            - output_format: 'pdf' to convert a DOCX template (optional)
         
         Returns:
             JSON with job id and status
@@ -67,6 +88,16 @@ class UploadView(View):
                     'supported': list(settings.SUPPORTED_DOCUMENT_TYPES.keys())
                 }, status=400)
             
+            # Validate output_format (only DOCX templates can be converted)
+            output_format = request.POST.get('output_format') or None
+            if output_format is not None and (
+                output_format != 'pdf'
+                or not resolve_template_file(template_name).endswith('.docx')
+            ):
+                return JsonResponse({
+                    'error': f'Formato de salida no soportado para {template_name}: {output_format}'
+                }, status=400)
+            
             # Get input data
             input_data = {}
             input_file = request.FILES.get('file')
@@ -95,7 +126,8 @@ class UploadView(View):
             job = DocumentService.create_job(
                 template_name=template_name,
                 input_data=input_data,
-                input_file=input_file
+                input_file=input_file,
+                output_format=output_format
             )
             
             # Send to Celery
@@ -117,6 +149,259 @@ class UploadView(View):
             }, status=500)
 
 
+class BatchUploadView(View):
+    """
+    View for creating batch (mail-merge) jobs.
+    
+    POST: Renders a list of records into a single PDF, or a DOCX zip
+    or merged document
+    """
+    
+    @method_decorator(csrf_exempt)
+    def post(self, request):
+        """
+        Processes a batch upload and creates a batch job.
+        
+        Expects:
+            - template_name: HTML or DOCX template type
+            - file: JSON file with a list of records (optional)
+            - data: JSON list of records directly in the body (if no file)
+            - split: 'true' to also store one PDF per record (HTML)
+            - bundle: 'zip' (default) or 'merged' (DOCX)
+        
+        The JSON may be a list of records or an object with a
+        'records' list.
+        
+        Returns:
+            JSON with job id and status
+        """
+        try:
+            template_name = request.POST.get('template_name')
+            template_file = settings.SUPPORTED_DOCUMENT_TYPES.get(template_name or '') \
+                and resolve_template_file(template_name)
+            
+            # HTML templates are merged into one PDF, DOCX templates into a
+            # zip or one merged document
+            if not template_file or not template_file.endswith(('.html.j2', '.docx')):
+                return JsonResponse({
+                    'error': f'Plantilla no soportada para lotes: {template_name}',
+                    'supported': [
+                        name for name in settings.SUPPORTED_DOCUMENT_TYPES
+                        if resolve_template_file(name).endswith(('.html.j2', '.docx'))
+                    ]
+                }, status=400)
+            
+            bundle = None
+            if template_file.endswith('.docx'):
+                bundle = request.POST.get('bundle') or 'zip'
+                if bundle not in BUNDLES:
+                    return JsonResponse({
+                        'error': f'Formato de lote no soportado: {bundle}',
+                        'supported': list(BUNDLES)
+                    }, status=400)
+            
+            input_file = request.FILES.get('file')
+            try:
+                if input_file:
+                    payload = json.loads(input_file.read().decode('utf-8'))
+                else:
+                    payload = json.loads(request.POST.get('data') or '[]')
+            except json.JSONDecodeError as e:
+                return JsonResponse({
+                    'error': f'JSON inválido: {str(e)}'
+                }, status=400)
+            
+            records = payload.get('records') if isinstance(payload, dict) else payload
+            if not isinstance(records, list) or not records \
+                    or not all(isinstance(record, dict) for record in records):
+                return JsonResponse({
+                    'error': 'Se esperaba una lista no vacía de registros'
+                }, status=400)
+            
+            split = request.POST.get('split', '').lower() in ('1', 'true', 'yes')
+            
+            job = DocumentService.create_batch_job(
+                template_name=template_name,
+                records=records,
+                split=split and bundle is None,
+                input_file=input_file,
+                bundle=bundle
+            )
+            
+            DocumentService.send_to_celery(job)
+            
+            logger.info(f'Lote creado y enviado a Celery: {job.id} ({len(records)} registros)')
+            
+            return JsonResponse({
+                'success': True,
+                'job_id': str(job.id),
+                'status': job.status,
+                'records': len(records),
+                'message': 'Lote en proceso de generación'
+            }, status=201)
+        
+        except Exception as e:
+            logger.error(f'Error en BatchUploadView: {str(e)}', exc_info=True)
+            return JsonResponse({
+                'error': str(e)
+            }, status=500)
+
+
+class AppendView(View):
+    """
+    View for appending records to the PDF of a completed job.
+    
+    POST: Renders only the new records and appends their pages
+    """
+    
+    @method_decorator(csrf_exempt)
+    def post(self, request, job_id):
+        """
+        Creates an append job whose parent is the given job.
+        
+        Expects:
+            - file: JSON file with a list of records (optional)
+            - data: JSON list of records directly in the body (if no file)
+        
+        The JSON may be a list of records or an object with a
+        'records' list. Appending to the result of an append job
+        extends the document again.
+        
+        Returns:
+            JSON with job id and status
+        """
+        try:
+            parent = DocumentService.get_job(job_id)
+            if not parent:
+                return JsonResponse({
+                    'error': 'Trabajo no encontrado'
+                }, status=404)
+            
+            input_file = request.FILES.get('file')
+            try:
+                if input_file:
+                    payload = json.loads(input_file.read().decode('utf-8'))
+                else:
+                    payload = json.loads(request.POST.get('data') or '[]')
+            except json.JSONDecodeError as e:
+                return JsonResponse({
+                    'error': f'JSON inválido: {str(e)}'
+                }, status=400)
+            
+            records = payload.get('records') if isinstance(payload, dict) else payload
+            if not isinstance(records, list) or not records \
+                    or not all(isinstance(record, dict) for record in records):
+                return JsonResponse({
+                    'error': 'Se esperaba una lista no vacía de registros'
+                }, status=400)
+            
+            try:
+                job = DocumentService.create_append_job(
+                    parent=parent,
+                    records=records,
+                    input_file=input_file
+                )
+            except ValueError:
+                if resolve_template_file(parent.template_name).endswith('.docx'):
+                    return JsonResponse({
+                        'error': f'El trabajo {parent.id} usa una plantilla DOCX y no admite anexos'
+                    }, status=400)
+                return JsonResponse({
+                    'error': f'El trabajo {parent.id} no tiene un PDF generado. Estado: {parent.status}'
+                }, status=400)
+            
+            DocumentService.send_to_celery(job)
+            
+            logger.info(f'Anexo creado y enviado a Celery: {job.id} (padre {parent.id}, {len(records)} registros)')
+            
+            return JsonResponse({
+                'success': True,
+                'job_id': str(job.id),
+                'parent_id': str(parent.id),
+                'status': job.status,
+                'records': len(records),
+                'message': 'Anexo en proceso de generación'
+            }, status=201)
+        
+        except Exception as e:
+            logger.error(f'Error en AppendView: {str(e)}', exc_info=True)
+            return JsonResponse({
+                'error': str(e)
+            }, status=500)
+
+
+class PreviewView(View):
+    """
+    View for previewing a document as HTML, without creating a job.
+    
+    POST: Renders the template synchronously and returns the HTML
+    """
+    
+    @method_decorator(csrf_exempt)
+    def post(self, request):
+        """
+        Renders the HTML of a document.
+        
+        Expects:
+            - template_name: HTML template type
+            - file: JSON file (optional)
+            - data: JSON directly in the body (if no file)
+        
+        Returns:
+            text/html with the template stylesheets inlined
+        """
+        try:
+            template_name = request.POST.get('template_name')
+            template_file = settings.SUPPORTED_DOCUMENT_TYPES.get(template_name or '') \
+                and resolve_template_file(template_name)
+            
+            if not template_file or not template_file.endswith('.html.j2'):
+                return JsonResponse({
+                    'error': f'Plantilla no soportada para vista previa: {template_name}',
+                    'supported': [
+                        name for name in settings.SUPPORTED_DOCUMENT_TYPES
+                        if resolve_template_file(name).endswith('.html.j2')
+                    ]
+                }, status=400)
+            
+            input_file = request.FILES.get('file')
+            try:
+                if input_file:
+                    input_data = json.loads(input_file.read().decode('utf-8'))
+                else:
+                    input_data = json.loads(request.POST.get('data') or '{}')
+            except json.JSONDecodeError as e:
+                return JsonResponse({
+                    'error': f'JSON inválido: {str(e)}'
+                }, status=400)
+            
+            if not isinstance(input_data, dict):
+                return JsonResponse({
+                    'error': 'Se esperaba un objeto JSON'
+                }, status=400)
+            
+            html = DocumentService.preview_html(template_name, input_data)
+            
+            response = HttpResponse(
+                inline_stylesheets(html, template_name),
+                content_type='text/html; charset=utf-8'
+            )
+            response['Cache-Control'] = 'no-store'
+            return response
+        
+        except RenderBudgetExceeded as e:
+            return JsonResponse({
+                'error': str(e),
+                'error_code': e.code
+            }, status=413)
+        
+        except Exception as e:
+            logger.error(f'Error en PreviewView: {str(e)}', exc_info=True)
+            return JsonResponse({
+                'error': str(e)
+            }, status=500)
+
+
 class StatusView(View):
     """
     View to check the status of a document job.
@@ -184,7 +469,16 @@ class DownloadView(View):
 
             # Determine file type and content type
             template_name = job.template_name.lower()
-            if 'docx' in template_name:
+            if job.output_file.name.endswith('.zip'):
+                content_type = 'application/zip'
+                extension = 'zip'
+            elif job.output_file.name.endswith('.json.gz'):
+                content_type = 'application/gzip'
+                extension = 'json.gz'
+            elif job.output_file.name.endswith('.json'):
+                content_type = 'application/json'
+                extension = 'json'
+            elif 'docx' in template_name and not job.converts_to_pdf():
                 content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
                 extension = 'docx'
             else:
@@ -195,8 +489,8 @@ class DownloadView(View):
             # Set filename based on job file name or job id
             filename = f"{job.file_name or job.id}.{extension}"
             
-            # Return file as attachment
-            response = FileResponse(job.output_file.open('rb'), content_type=content_type)
+            # Return file as attachment, or the requested byte range of it
+            response = _ranged_file_response(request, job.output_file, content_type)
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
             
             logger.info(f'Documento descargado: {job_id} ({filename})')
@@ -213,6 +507,176 @@ class DownloadView(View):
                 'error': str(e)
             }, status=500)
 
+class ThumbnailView(View):
+    """
+    View to get the first-page thumbnail of a generated PDF.
+    
+    GET: Returns a PNG, generated on the first request
+    """
+    
+    def get(self, request, job_id):
+        """
+        Gets the thumbnail of a job.
+        
+        Args:
+            job_id: ID of the job
+        
+        Returns:
+            PNG image with cache headers
+        """
+        job = get_object_or_404(DocumentJob, id=job_id)
+        
+        error = _check_pdf_output(job)
+        if error:
+            return error
+        
+        try:
+            return _image_response(request, get_thumbnail(job), 'image/png')
+        except RASTER_ERRORS as e:
+            return _raster_error(job, e)
+
+
+class RasterView(View):
+    """
+    View to get a page of a generated PDF as an image.
+    
+    GET: Returns a PNG/TIFF of one page, generated on the first request
+    """
+    
+    def get(self, request, job_id):
+        """
+        Gets one page of a job as an image.
+        
+        Optional parameters:
+            - page: Page number (default: 1)
+            - dpi: Resolution (default: RASTER_DEFAULT_DPI)
+            - format: 'png' | 'tiff' (default: 'png')
+        
+        Args:
+            job_id: ID of the job
+        
+        Returns:
+            Image with cache headers
+        """
+        job = get_object_or_404(DocumentJob, id=job_id)
+        
+        error = _check_pdf_output(job)
+        if error:
+            return error
+        
+        output_format = request.GET.get('format', 'png').lower()
+        try:
+            page_number = int(request.GET.get('page', 1))
+            dpi = int(request.GET.get('dpi', settings.RASTER_DEFAULT_DPI))
+            name = get_raster(job, page_number, dpi, output_format)
+        except ValueError as e:
+            return JsonResponse({
+                'error': str(e),
+                'formats': list(RASTER_FORMATS)
+            }, status=400)
+        except RASTER_ERRORS as e:
+            return _raster_error(job, e)
+        
+        return _image_response(request, name, RASTER_FORMATS[output_format][1])
+
+
+def _ranged_file_response(request, file_field, content_type):
+    """
+    Serve a stored file, honouring a single-range ``Range`` header.
+    
+    Lets PDF viewers fetch the first page of a linearized PDF before the
+    rest of the file. Multiple or invalid ranges are answered with the
+    whole file; 416 is only returned for a valid range outside the file.
+    """
+    size = file_field.size
+    match = RANGE_RE.match(request.headers.get('Range', '').strip())
+    
+    # An invalid range (last byte before the first) is ignored (RFC 9110)
+    if match and all(match.groups()) and int(match.group(2)) < int(match.group(1)):
+        match = None
+    
+    if not match or not any(match.groups()):
+        response = FileResponse(file_field.open('rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+    
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(end), 0)
+        end = size - 1
+    
+    if start >= size or start > end:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    
+    length = end - start + 1
+    stored_file = file_field.open('rb')
+    stored_file.seek(start)
+    
+    def read_range(remaining=length, chunk_size=64 * 1024):
+        try:
+            while remaining > 0:
+                chunk = stored_file.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            stored_file.close()
+    
+    response = StreamingHttpResponse(read_range(), status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _raster_error(job, exc):
+    """Answer a failed rasterisation: 404 if the stored PDF is gone, 500 otherwise."""
+    if isinstance(exc, FileNotFoundError):
+        return JsonResponse({
+            'error': 'Archivo de salida no encontrado'
+        }, status=404)
+    
+    logger.error(f'Error al rasterizar el trabajo {job.id}: {str(exc)}', exc_info=True)
+    return JsonResponse({
+        'error': 'No se pudo generar la imagen del documento'
+    }, status=500)
+
+
+def _check_pdf_output(job):
+    """Return an error response unless the job has a PDF output."""
+    if not job.is_completed():
+        return JsonResponse({
+            'error': f'Documento aún no está listo. Estado: {job.status}'
+        }, status=400)
+    
+    if not job.output_file or not job.output_file.name.endswith('.pdf'):
+        return JsonResponse({
+            'error': 'El trabajo no tiene un PDF de salida'
+        }, status=404)
+    
+    return None
+
+
+def _image_response(request, name, content_type):
+    """Serve a stored image; its name identifies its content, so it is cacheable."""
+    etag = f'"{name}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(default_storage.open(name, 'rb'), content_type=content_type)
+    
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=settings.RASTER_CACHE_MAX_AGE)
+    return response
+
+
 class ListJobsView(View):
     """
     View to list jobs (for debugging and monitoring).
@@ -147,6 +147,27 @@ GENERATED_DOCUMENTS_DIR.mkdir(exist_ok=True)
 UPLOADED_FILES_DIR.mkdir(exist_ok=True)
 
 
+# Cache (Redis compartido entre web y workers; memoria local en desarrollo)
+if config('CACHE_BACKEND', default='locmem') == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://{}:{}/{}'.format(
+                config('REDIS_HOST', default='localhost'),
+                config('REDIS_PORT', default='6379'),
+                config('REDIS_DB', default='2'),
+            ),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -190,7 +211,10 @@ CELERY_TASK_DEFAULT_RETRY_DELAY = 60  # segundos
 # Configuración de colas
 CELERY_TASK_ROUTES = {
     'docs.tasks.generate_pdf_task': {'queue': 'documents'},
+    'docs.tasks.generate_pdf_batch_task': {'queue': 'documents'},
+    'docs.tasks.generate_pdf_append_task': {'queue': 'documents'},
     'docs.tasks.generate_docx_task': {'queue': 'documents'},
+    'docs.tasks.generate_docx_batch_task': {'queue': 'documents'},
     'docs.tasks.generate_json_task': {'queue': 'documents'},
 }
 
@@ -223,14 +247,257 @@ CELERY_LOGLEVEL = config('CELERY_LOGLEVEL', default='info')
 # Directorio de plantillas Jinja2
 TEMPLATES_DOC_DIR = BASE_DIR / 'templates_doc'
 
-# Tipos de docs soportados
+# Caché de bytecode Jinja2 compartida por todos los procesos del worker
+JINJA_BYTECODE_CACHE_DIR = Path(config(
+    'JINJA_BYTECODE_CACHE_DIR',
+    default=str(BASE_DIR / '.cache' / 'jinja'),
+))
+JINJA_BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Caché de documentos renderizados (plantilla + datos + formato)
+RENDER_CACHE_ENABLED = config('RENDER_CACHE_ENABLED', default=True, cast=bool)
+RENDER_CACHE_TTL = config('RENDER_CACHE_TTL', default=24 * 60 * 60, cast=int)  # 1 día
+RENDER_CACHE_LOCK_TIMEOUT = 10 * 60  # segundos
+RENDER_CACHE_COALESCE_COUNTDOWN = 5  # segundos entre reintentos de trabajos idénticos
+RENDER_PREVIEW_TTL = 5 * 60  # segundos que el HTML de una vista previa se reutiliza
+RENDER_ASSET_STAMP_TTL = config('RENDER_ASSET_STAMP_TTL', default=60, cast=int)  # segundos; los archivos de assets añadidos o borrados se detectan al momento
+
+# Pool de subprocesos de renderizado por proceso del worker: WeasyPrint y
+# docxtpl se ejecutan fuera del proceso de Celery y cada subproceso se
+# recicla tras N trabajos o al superar el umbral de memoria (RSS)
+RENDER_POOL_ENABLED = config('RENDER_POOL_ENABLED', default=True, cast=bool)
+RENDER_POOL_SIZE = config('RENDER_POOL_SIZE', default=1, cast=int)
+RENDER_POOL_MAX_JOBS = config('RENDER_POOL_MAX_JOBS', default=500, cast=int)
+RENDER_POOL_MAX_RSS_MB = config('RENDER_POOL_MAX_RSS_MB', default=512, cast=int)
+RENDER_POOL_START_TIMEOUT = 60  # segundos
+RENDER_POOL_JOB_TIMEOUT = 20 * 60  # segundos, por debajo de CELERY_TASK_SOFT_TIME_LIMIT
+
+# Conversión DOCX -> PDF (output_format='pdf') con procesos LibreOffice
+# persistentes (unoserver) por proceso del worker: se comprueban antes de
+# usarse si llevan tiempo inactivos y se reciclan tras N conversiones, al
+# terminar o tras un error o timeout
+OFFICE_SERVER_COMMAND = config('OFFICE_SERVER_COMMAND', default='unoserver')
+OFFICE_POOL_SIZE = config('OFFICE_POOL_SIZE', default=1, cast=int)
+OFFICE_POOL_PRESTART = config('OFFICE_POOL_PRESTART', default=False, cast=bool)
+OFFICE_MAX_CONVERSIONS = config('OFFICE_MAX_CONVERSIONS', default=200, cast=int)
+OFFICE_START_TIMEOUT = 60  # segundos
+OFFICE_CONVERSION_TIMEOUT = config('OFFICE_CONVERSION_TIMEOUT', default=120, cast=int)
+OFFICE_HEALTH_CHECK_INTERVAL = 30  # segundos de inactividad antes de comprobarlo
+
+# Lotes DOCX: cada cuántos registros se publica el progreso en la caché
+DOCX_BATCH_PROGRESS_INTERVAL = config('DOCX_BATCH_PROGRESS_INTERVAL', default=10, cast=int)
+
+# Ficheros renderizados que se escriben en disco y se pasan al storage sin
+# cargarlos en memoria; en el mismo sistema de ficheros que MEDIA_ROOT se
+# mueven en lugar de copiarse
+RENDER_SPOOL_DIR = Path(config(
+    'RENDER_SPOOL_DIR',
+    default=str(MEDIA_ROOT / '.spool'),
+))
+RENDER_SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+
+# Salida JSON: se escribe por partes en RENDER_SPOOL_DIR. 'compact' quita la
+# sangría, 'gzip' genera un .json.gz y 'reference_input' sustituye la copia
+# de input_data por una referencia a la entrada guardada del trabajo
+JSON_OUTPUT_OPTIONS = {
+    'compact': config('JSON_OUTPUT_COMPACT', default=False, cast=bool),
+    'gzip': config('JSON_OUTPUT_GZIP', default=False, cast=bool),
+    'reference_input': config('JSON_OUTPUT_REFERENCE_INPUT', default=False, cast=bool),
+}
+
+# Opciones por plantilla (sobre JSON_OUTPUT_OPTIONS)
+DOCUMENT_JSON_OUTPUT_OPTIONS = {}
+JSON_OUTPUT_GZIP_LEVEL = 6
+
+# Presupuesto de recursos por renderizado: los trabajos que lo superan
+# fallan con error_code 'render_budget_exceeded' y no se reintentan.
+# None desactiva un límite
+RENDER_BUDGETS = {
+    'max_html_chars': 5 * 1024 * 1024,
+    'max_pages': 500,
+    'max_seconds': 120,
+    'max_memory_mb': 1024,  # crecimiento de RSS durante el renderizado
+}
+
+# Límites por plantilla (sustituyen a los de RENDER_BUDGETS)
+DOCUMENT_RENDER_BUDGETS = {
+    'invoice': {'max_pages': 2000, 'max_seconds': 300},  # ver CHUNKED_TEMPLATES
+    'certificate': {'max_pages': 2, 'max_seconds': 20},
+    'certificate_canvas': {'max_pages': 1, 'max_seconds': 10},
+}
+
+# Trabajos con varios registros (lotes, anexos): los límites de tamaño y
+# tiempo de la plantilla se multiplican por el número de registros, sin
+# superar estos; la memoria se limita con el valor de aquí
+RENDER_BATCH_BUDGETS = {
+    'max_html_chars': 50 * 1024 * 1024,
+    'max_pages': 5000,
+    'max_seconds': 15 * 60,  # por debajo de RENDER_POOL_JOB_TIMEOUT
+    'max_memory_mb': 2048,
+}
+
+# Recursos (imágenes, fuentes) que los PDF pueden referenciar; cualquier
+# otra URL, local o de red, se rechaza sin intentar descargarla
+DOCUMENT_ASSETS_DIR = TEMPLATES_DOC_DIR / 'assets'
+PDF_ASSET_MAX_BYTES = 5 * 1024 * 1024  # por recurso
+PDF_ASSET_CACHE_MAX_BYTES = 64 * 1024 * 1024  # caché LRU por proceso
+
+# Imágenes referenciadas en los datos ({"$image": "logos/acme.png",
+# "width_mm": 40}): se redimensionan y recomprimen una vez por contenido y
+# tamaño, y se guardan en IMAGE_CACHE_DIR para todos los trabajos DOCX y PDF
+IMAGE_CACHE_DIR = BASE_DIR / '.cache' / 'images'
+IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+IMAGE_RESIZE_DPI = config('IMAGE_RESIZE_DPI', default=200, cast=int)
+IMAGE_JPEG_QUALITY = config('IMAGE_JPEG_QUALITY', default=85, cast=int)
+IMAGE_MAX_SIDE_PX = 2000  # sin tamaño indicado
+
+# Tipos de docs soportados. El valor es el archivo de la plantilla o un dict
+# {'file': ..., 'renderer': ...} que elige el motor PDF (ver PDF_RENDERERS)
 SUPPORTED_DOCUMENT_TYPES = {
     'contract': 'contract.html.j2',
     'invoice': 'invoice.html.j2',
     'certificate': 'certificate.html.j2',
+    # Mismo certificado con diseño fijo: se dibuja desde
+    # layouts/certificate_canvas.json sin maquetar HTML
+    'certificate_canvas': {
+        'file': 'certificate.html.j2',
+        'renderer': 'canvas',
+    },
+    # Ejemplo de documento compuesto: el contrato con portada y condiciones
+    # generales de muestra (ver COMPOSITE_TEMPLATES)
+    'contract_composite': 'contract.html.j2',
     "docx_contract": "contract.docx",
 }
 
+# Motores de PDF: nombre -> función (template_name, context, options, budget)
+# que devuelve el PDF. 'weasyprint' es el motor por defecto de las plantillas
+# HTML; 'canvas' dibuja directamente el diseño fijo de layouts/<plantilla>.json
+PDF_DEFAULT_RENDERER = 'weasyprint'
+PDF_RENDERERS = {
+    'weasyprint': 'docs.tasks._render_weasyprint_pdf',
+    'canvas': 'docs.canvas.render_canvas_pdf',
+}
+
+# Directorios (y subdirectorios) donde se buscan por nombre las fuentes
+# TrueType de los diseños 'canvas' que no están en TEMPLATES_DOC_DIR
+CANVAS_FONT_DIRS = [
+    Path(path) for path in config(
+        'CANVAS_FONT_DIRS',
+        default=f'{TEMPLATES_DOC_DIR / "assets" / "fonts"},/usr/share/fonts',
+        cast=Csv(),
+    )
+]
+
+# Hojas de estilo por plantilla (relativas a TEMPLATES_DOC_DIR), parseadas
+# una vez por proceso del worker y aplicadas a cada PDF
+DOCUMENT_STYLESHEETS = {
+    'contract': ['styles/contract.css'],
+    'invoice': ['styles/invoice.css', 'styles/page_numbers.css'],
+    'certificate': ['styles/certificate.css'],
+    'certificate_canvas': ['styles/certificate.css'],  # vista previa, lotes
+    'contract_composite': ['styles/contract.css', 'styles/contract_sections.css'],
+}
+
+# Perfiles de salida PDF (opciones de write_pdf de WeasyPrint). Las fuentes
+# se incrustan como subconjunto salvo que el perfil use 'full_fonts'
+PDF_OUTPUT_PROFILES = {
+    'standard': {},
+    'compact': {
+        'optimize_images': True,
+        'jpeg_quality': 60,
+        'dpi': 150,
+    },
+    'print': {
+        'optimize_images': True,
+        'jpeg_quality': 90,
+        'dpi': 300,
+        'pdf_version': '1.7',
+    },
+}
+PDF_DEFAULT_OUTPUT_PROFILE = config('PDF_DEFAULT_OUTPUT_PROFILE', default='standard')
+
+# PDF linealizados ("vista web rápida") a partir de este tamaño, para que
+# el visor muestre la primera página antes de descargar el archivo completo
+PDF_LINEARIZE = config('PDF_LINEARIZE', default=True, cast=bool)
+PDF_LINEARIZE_MIN_BYTES = config('PDF_LINEARIZE_MIN_BYTES', default=1024 * 1024, cast=int)
+
+# Perfil por plantilla (las no listadas usan PDF_DEFAULT_OUTPUT_PROFILE)
+DOCUMENT_OUTPUT_PROFILES = {
+    'contract': 'compact',
+    'invoice': 'compact',
+    'certificate': 'standard',
+    'certificate_canvas': 'standard',
+    'contract_composite': 'compact',
+}
+
+# Hojas de estilo añadidas cuando se combinan varios registros en un PDF
+BATCH_STYLESHEETS = ['styles/batch.css']
+
+# Plantillas renderizadas en dos capas: un fondo estático, generado una vez
+# por versión y cacheado como PDF, y los campos dinámicos superpuestos
+LAYERED_TEMPLATES = {
+    'certificate': {
+        'background': 'layers/certificate_background.html.j2',
+        'overlay': 'layers/certificate_overlay.html.j2',
+        'stylesheets': ['styles/certificate_layers.css'],
+    },
+}
+LAYER_CACHE_DIR = BASE_DIR / '.cache' / 'layers'
+LAYER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Documentos compuestos: partes HTML maquetadas por separado y concatenadas.
+# Las partes 'static' no usan datos del trabajo; se maquetan una vez por
+# versión y se guardan como PDF en SECTION_CACHE_DIR. 'contract_composite' es
+# un ejemplo opcional: sus secciones son texto de muestra, no cláusulas reales
+COMPOSITE_TEMPLATES = {
+    'contract_composite': [
+        {'template': 'sections/contract_cover.html.j2'},
+        {'template': 'contract.html.j2'},
+        {'template': 'sections/contract_terms.html.j2', 'static': True},
+    ],
+}
+SECTION_CACHE_DIR = BASE_DIR / '.cache' / 'sections'
+SECTION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Códigos QR y de barras (filtros qr_code/barcode): entradas de la caché LRU
+# por proceso de códigos ya generados
+CODE_CACHE_SIZE = config('CODE_CACHE_SIZE', default=4096, cast=int)
+
+# Miniaturas y exportaciones raster de los PDF, generadas bajo demanda y
+# guardadas junto al archivo de salida
+THUMBNAIL_WIDTH = 200  # píxeles
+RASTER_DEFAULT_DPI = config('RASTER_DEFAULT_DPI', default=150, cast=int)
+RASTER_MAX_DPI = config('RASTER_MAX_DPI', default=300, cast=int)
+RASTER_CACHE_MAX_AGE = 24 * 60 * 60  # segundos (Cache-Control)
+
+# Plantillas con tablas muy largas: si la lista 'rows_key' supera
+# 'rows_per_chunk' filas se divide en fragmentos maquetados en paralelo y
+# concatenados. La hoja 'page_numbers' se aplica después sobre el documento
+# completo para que la numeración sea continua
+CHUNKED_TEMPLATES = {
+    'invoice': {
+        'rows_key': 'items',
+        'rows_per_chunk': 1000,
+        'page_numbers': 'styles/page_numbers.css',
+    },
+}
+CHUNK_RENDER_WORKERS = config('CHUNK_RENDER_WORKERS', default=4, cast=int)
+
+# Tablas pre-paginadas (filtro paginate): alturas estimadas en mm para partir
+# las filas en una tabla por página, con subtotal y suma anterior. Valores
+# conservadores para A4 con los márgenes por defecto
+PAGINATED_TABLES = {
+    'invoice': {
+        'text_key': 'description',   # columna que se parte en varias líneas
+        'chars_per_line': 40,
+        'line_height_mm': 3.8,
+        'row_padding_mm': 6.8,       # padding + borde de cada fila
+        'amount_key': 'subtotal',    # columna sumada por página
+        'first_page_mm': 110,        # bajo la cabecera y los datos de las partes
+        'page_mm': 190,              # páginas siguientes
+    },
+}
+
 # Configuración de WeasyPrint
 WEASYPRINT_FONT_SIZES = {
     'small': '12px',